@@ -1,21 +1,31 @@
 # azure_predictor.py
 
 import os
+import io
+import csv
 import json
+import random
+import threading
+import time
+from fnmatch import fnmatch
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
 from PIL import Image
-from dotenv import load_dotenv
 
-# .env 파일에서 환경 변수 로드
-load_dotenv()
+import config
+import metadata_cache
+import storage
 
 # --- 설정 (학습/예측 리소스 정보 모두 사용) ---
-PREDICTION_KEY = os.getenv("AZURE_PREDICTION_KEY")
-PREDICTION_ENDPOINT = os.getenv("AZURE_PREDICTION_ENDPOINT")
-TRAINING_KEY = os.getenv("AZURE_TRAINING_KEY")
-TRAINING_ENDPOINT = os.getenv("AZURE_TRAINING_ENDPOINT")
-# 예측을 수행할 프로젝트 A의 ID를 불러옵니다.
-PROJECT_ID = os.getenv("AZURE_PREDICTION_PROJECT_ID")
+# import 시점에는 비어 있으며, run_prediction()이 configure()로 채웁니다.
+PREDICTION_KEY = None
+PREDICTION_ENDPOINT = None
+TRAINING_KEY = None
+TRAINING_ENDPOINT = None
+# 예측을 수행할 프로젝트 A의 ID
+PROJECT_ID = None
 
 # --- 이 부분이 이제 '진실의 원천(Single Source of Truth)'이 됩니다 ---
 LABEL_INFO = {
@@ -25,6 +35,56 @@ LABEL_INFO = {
     "텍스트": {"id": 4, "threshold": 0.8},
 }
 
+# 예측 엔드포인트는 초당 요청 수가 제한되므로(F0는 초당 2회) 429 응답은 Retry-After 또는 지수 백오프 후 재시도합니다.
+MAX_THROTTLE_RETRIES = 6
+THROTTLE_BACKOFF_SECONDS = 1.0
+# 로컬 추론 실패 비율이 이보다 크면 모델/환경 문제로 보고 전체를 원격 예측으로 대체합니다.
+MAX_LOCAL_FAILURE_RATIO = 0.5
+
+# 예측 중 게시가 취소된 Iteration(404)을 최신 게시 Iteration으로 바꾼 기록 {이전 게시 이름: 새 게시 이름 또는 None}
+# 여러 스레드가 동시에 404를 받아도 Iteration 목록은 프로세스당 한 번만 다시 조회합니다.
+_republished = {}
+_republished_lock = threading.Lock()
+
+# 유튜브 썸네일 종류별 고정 크기. URL만으로 크기를 알 수 있어 COCO 변환 시 이미지 파일을 열지 않아도 됩니다.
+THUMBNAIL_SIZES = {
+    "maxresdefault": (1280, 720),
+    "hq720": (1280, 720),
+    "sddefault": (640, 480),
+    "hqdefault": (480, 360),
+    "mqdefault": (320, 180),
+    "default": (120, 90),
+}
+
+
+def configure(pipeline_config):
+    """PipelineConfig 객체의 값으로 이 모듈의 Azure 설정을 채웁니다."""
+    global PREDICTION_KEY, PREDICTION_ENDPOINT, TRAINING_KEY, TRAINING_ENDPOINT, PROJECT_ID
+    PREDICTION_KEY = pipeline_config.prediction_key
+    PREDICTION_ENDPOINT = pipeline_config.prediction_endpoint
+    TRAINING_KEY = pipeline_config.training_key
+    TRAINING_ENDPOINT = pipeline_config.training_endpoint
+    PROJECT_ID = pipeline_config.prediction_project_id
+    metadata_cache.configure(pipeline_config)
+
+
+def _fetch_json(url):
+    res = requests.get(url, headers={"Training-Key": TRAINING_KEY}, timeout=metadata_cache.FETCH_TIMEOUT_SECONDS)
+    res.raise_for_status()
+    return res.json()
+
+
+def list_tags(project_id):
+    """프로젝트 태그 목록을 메타데이터 캐시를 거쳐 조회합니다."""
+    url = f"{TRAINING_ENDPOINT}customvision/v3.3/training/projects/{project_id}/tags"
+    return metadata_cache.get_or_fetch(metadata_cache.tags_key(project_id), lambda: _fetch_json(url))
+
+
+def list_iterations(project_id):
+    """프로젝트 Iteration 목록을 메타데이터 캐시를 거쳐 조회합니다."""
+    url = f"{TRAINING_ENDPOINT}customvision/v3.3/training/projects/{project_id}/iterations"
+    return metadata_cache.get_or_fetch(metadata_cache.iterations_key(project_id), lambda: _fetch_json(url))
+
 
 # --- 신규 함수: Azure 프로젝트의 태그와 코드의 LABEL_INFO를 비교 검증 ---
 def validate_azure_tags(project_id, label_info_from_code):
@@ -34,13 +94,8 @@ def validate_azure_tags(project_id, label_info_from_code):
     """
     print(f"\n🔄 예측 프로젝트(ID: {project_id})의 태그 유효성을 검사합니다...")
 
-    get_tags_url = f"{TRAINING_ENDPOINT}customvision/v3.3/training/projects/{project_id}/tags"
-    headers = {"Training-Key": TRAINING_KEY}
-
     try:
-        res = requests.get(get_tags_url, headers=headers)
-        res.raise_for_status()
-        api_tags = res.json()
+        api_tags = list_tags(project_id)
     except requests.exceptions.RequestException as e:
         print(f"❌ Azure에서 태그 목록 조회 실패: {e}");
         return False
@@ -64,44 +119,213 @@ def validate_azure_tags(project_id, label_info_from_code):
         return False
 
 
-def get_latest_published_iteration_url(project_id):
-    # ... (이전과 동일, 변경 없음)
-    iterations_url = f"{TRAINING_ENDPOINT}customvision/v3.3/training/projects/{project_id}/iterations"
-    headers = {"Training-Key": TRAINING_KEY}
+def get_latest_published_iteration(project_id):
+    """가장 최근에 게시된 Iteration 정보를 반환합니다. 실패 시 None을 반환합니다."""
     try:
-        res = requests.get(iterations_url, headers=headers);
-        res.raise_for_status()
-        iterations = [it for it in res.json() if it.get("publishName")]
+        iterations = [it for it in list_iterations(project_id) if it.get("publishName")]
         if not iterations: raise RuntimeError("게시된 Iteration이 없습니다.")
         latest_iteration = sorted(iterations, key=lambda it: it["lastModified"], reverse=True)[0]
         print(f"✅ 예측에 사용될 Iteration: '{latest_iteration['publishName']}'")
-        return f"{PREDICTION_ENDPOINT}customvision/v3.0/Prediction/{project_id}/detect/iterations/{latest_iteration['publishName']}/image"
+        return latest_iteration
     except Exception as e:
         print(f"❌ Iteration 정보 조회 실패: {e}"); return None
 
 
-def predict_image(image_path, prediction_url):
-    # ... (이전과 동일, 변경 없음)
-    with open(image_path, "rb") as f:
-        response = requests.post(prediction_url,
-                                 headers={"Prediction-Key": PREDICTION_KEY, "Content-Type": "application/octet-stream"},
-                                 data=f)
+def build_prediction_url(project_id, iteration):
+    return f"{PREDICTION_ENDPOINT}customvision/v3.0/Prediction/{project_id}/detect/iterations/{iteration['publishName']}/image"
+
+
+def build_url_prediction_url(project_id, iteration):
+    return f"{PREDICTION_ENDPOINT}customvision/v3.0/Prediction/{project_id}/detect/iterations/{iteration['publishName']}/url"
+
+
+def get_latest_published_iteration_url(project_id):
+    latest_iteration = get_latest_published_iteration(project_id)
+    if latest_iteration is None:
+        return None
+    return build_prediction_url(project_id, latest_iteration)
+
+
+def _refresh_prediction_url(url):
+    """
+    예측 URL의 Iteration이 게시 취소되어 404를 받았을 때 호출합니다.
+    Iteration 캐시를 버리고 최신 게시 Iteration으로 바꾼 URL을 반환하며, 바꿀 Iteration이 없으면 None을 반환합니다.
+    """
+    prefix, _, rest = url.partition("/iterations/")
+    publish_name, _, suffix = rest.partition("/")
+    project_id = prefix.rsplit("/", 2)[-2]  # .../Prediction/<프로젝트 ID>/detect
+    with _republished_lock:
+        if publish_name not in _republished:
+            print(f"⚠️ Iteration '{publish_name}'을(를) 찾을 수 없어 최신 게시 Iteration을 다시 조회합니다.")
+            metadata_cache.invalidate(metadata_cache.iterations_key(project_id))
+            latest_iteration = get_latest_published_iteration(project_id)
+            _republished[publish_name] = latest_iteration["publishName"] if latest_iteration else None
+        new_name = _republished[publish_name]
+    if not new_name or new_name == publish_name:
+        return None
+    return f"{prefix}/iterations/{new_name}/{suffix}"
+
+
+def _post_prediction(url, **kwargs):
+    """
+    예측 요청을 보내고, 429(요청 한도 초과)면 Retry-After 또는 지수 백오프만큼 기다린 뒤 재시도합니다.
+    404(캐시된 Iteration이 게시 취소됨)면 최신 게시 Iteration으로 한 번 다시 요청합니다.
+    """
+    data = kwargs.get("data")
+    attempt, refreshed = 0, False
+    while True:
+        if hasattr(data, "seek"):
+            data.seek(0)  # 파일 바이트를 다시 보내기 위해 처음으로 되돌립니다.
+        response = requests.post(url, timeout=60, **kwargs)
+        if response.status_code == 404 and not refreshed:
+            refreshed, new_url = True, _refresh_prediction_url(url)
+            if new_url is not None:
+                url = new_url
+                continue
+        if response.status_code != 429 or attempt == MAX_THROTTLE_RETRIES:
+            break
+        try:
+            delay = float(response.headers.get("Retry-After", ""))
+        except ValueError:
+            delay = THROTTLE_BACKOFF_SECONDS * (2 ** attempt) * (1 + random.random() / 2)
+        time.sleep(delay)
+        attempt += 1
     response.raise_for_status()
     return response.json()
 
 
-def convert_to_coco(image_folder, prediction_url, label_info):
-    # ... (이전과 동일, 변경 없음)
-    coco = {"images": [], "annotations": [], "categories": [{"id": v["id"], "name": k} for k, v in label_info.items()]}
-    annotation_id_counter = 1
-    image_files = [f for f in os.listdir(image_folder) if f.lower().endswith((".jpg", ".jpeg", ".png"))]
+def predict_image_file(image_file, prediction_url):
+    """열린 이미지 파일(폴더 또는 압축본에서 연 파일)의 바이트를 전송하여 예측합니다."""
+    return _post_prediction(prediction_url,
+                            headers={"Prediction-Key": PREDICTION_KEY, "Content-Type": "application/octet-stream"},
+                            data=image_file)
+
+
+def predict_image(image_path, prediction_url):
+    with open(image_path, "rb") as f:
+        return predict_image_file(f, prediction_url)
+
+
+def predict_image_url(image_url, url_prediction_url):
+    """이미지 바이트를 보내지 않고, 공개 URL만 전달하여 예측합니다."""
+    return _post_prediction(url_prediction_url,
+                            headers={"Prediction-Key": PREDICTION_KEY, "Content-Type": "application/json"},
+                            json={"Url": image_url})
+
+
+def predict_one_image(run_data, file_name, image_url, url_prediction_url, file_prediction_url):
+    """
+    이미지 한 장을 URL로 예측하고, URL이 없거나 실패하면 로컬(또는 압축본) 바이트로 다시 예측합니다.
+    run_data는 storage.open_run()이 반환한 읽기 객체입니다. 실패 시 예외를 그대로 전달합니다.
+    """
+    if image_url:
+        try:
+            return predict_image_url(image_url, url_prediction_url)
+        except requests.exceptions.RequestException as e:
+            print(f"  - ⚠️ URL 예측 실패, 파일로 재시도: {file_name} ({e})")
+    with run_data.open_image(file_name) as f:
+        return predict_image_file(f, file_prediction_url)
+
+
+def predict_by_urls(image_folder, project_id, iteration, concurrency=8):
+    """
+    크롤러가 기록한 썸네일 URL로 폴더 전체를 동시에 예측합니다.
+    URL이 없거나 URL 예측이 실패한 이미지는 로컬 파일 바이트로 다시 예측합니다.
+    URL 정보가 전혀 없으면 None을 반환하여 기존 파일 업로드 방식으로 처리하게 합니다.
+    반환값: {파일 이름: 예측 결과 또는 예외}
+    """
+    thumbnail_urls = load_thumbnail_urls(image_folder)
+    if not thumbnail_urls:
+        print("⚠️ 썸네일 URL 정보가 없어 파일 기반 예측을 사용합니다.")
+        return None
+
+    url_prediction_url = build_url_prediction_url(project_id, iteration)
+    file_prediction_url = build_prediction_url(project_id, iteration)
+    run_data = storage.open_run(image_folder)
+
+    def predict_one(file_name):
+        try:
+            return file_name, predict_one_image(run_data, file_name, thumbnail_urls.get(file_name),
+                                                url_prediction_url, file_prediction_url)
+        except Exception as e:
+            return file_name, e
+
+    image_files = list_image_files(image_folder)
+    print(f"\n🔗 URL 기반 예측 시작 (이미지 {len(image_files)}개, 동시 요청 {concurrency}개)")
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as executor:
+        return dict(executor.map(predict_one, image_files))
+
+
+def list_image_files(image_folder):
+    """실행 폴더 또는 압축된 실행의 썸네일 파일 이름 목록을 반환합니다."""
+    return storage.open_run(image_folder).list_images()
+
+
+def load_thumbnail_urls(image_folder):
+    """
+    크롤러가 저장한 순위 CSV에서 {썸네일 파일 이름: 원본 썸네일 URL} 매핑을 읽습니다.
+    CSV가 없거나 URL 컬럼이 없는 예전 실행 폴더에서는 빈 딕셔너리를 반환합니다.
+    """
+    try:
+        run_data = storage.open_run(image_folder)
+    except FileNotFoundError:
+        return {}
+    thumbnail_urls = {}
+    for relpath in run_data.list_files():
+        if not fnmatch(relpath, "youtube_trending_rankings_*.csv"):
+            continue
+        with io.TextIOWrapper(run_data.open_file(relpath), encoding="utf-8-sig", newline="") as f:
+            for row in csv.DictReader(f):
+                if row.get("thumbnail_file") and row.get("thumbnail_url"):
+                    thumbnail_urls[row["thumbnail_file"]] = row["thumbnail_url"]
+    return thumbnail_urls
+
+
+def thumbnail_size_from_url(image_url):
+    """유튜브 썸네일 URL의 종류(maxresdefault, hqdefault 등)로 (너비, 높이)를 알아냅니다. 모르면 None을 반환합니다."""
+    if not image_url:
+        return None
+    variant = os.path.splitext(os.path.basename(urlparse(image_url).path))[0]
+    return THUMBNAIL_SIZES.get(variant)
+
+
+def convert_to_coco(image_folder, prediction_url, label_info, precomputed_results=None):
+    """
+    폴더의 이미지를 예측하여 COCO 형식으로 변환합니다.
+    precomputed_results({파일 이름: 예측 결과 또는 예외})가 주어지면 (로컬 추론, URL 예측 등)
+    이미지별 원격 호출 대신 그 결과를 사용하며, bbox 변환용 크기는 썸네일 URL 종류로 정하거나
+    (알 수 없을 때만) 로컬 파일에서 읽습니다.
+    """
+    coco = {"images": [], "annotations": [],
+            "categories": [{"id": v["id"], "name": k, "threshold": v["threshold"]} for k, v in label_info.items()]}
+    annotation_id_counter, failed_count = 1, 0
+    image_files = list_image_files(image_folder)
+    thumbnail_urls = load_thumbnail_urls(image_folder)
+    run_data = storage.open_run(image_folder)
     for image_id_counter, file_name in enumerate(image_files, 1):
-        image_path = os.path.join(image_folder, file_name)
         try:
-            with Image.open(image_path) as img:
-                width, height = img.size
-            coco["images"].append({"id": image_id_counter, "file_name": file_name, "width": width, "height": height})
-            prediction_result = predict_image(image_path, prediction_url)
+            # URL 예측이라면 썸네일 종류로 크기를 정해, 내려받은 파일에 의존하지 않습니다.
+            size = thumbnail_size_from_url(thumbnail_urls.get(file_name))
+            if size is None:
+                with run_data.open_image(file_name) as f, Image.open(f) as img:
+                    size = img.size
+            width, height = size
+            image_entry = {"id": image_id_counter, "file_name": file_name, "width": width, "height": height}
+            # 업로더가 이미지 바이트 대신 URL로 업로드할 수 있도록 원본 URL을 COCO 표준 필드에 기록합니다.
+            if file_name in thumbnail_urls:
+                image_entry["coco_url"] = thumbnail_urls[file_name]
+            coco["images"].append(image_entry)
+            if precomputed_results is None:
+                with run_data.open_image(file_name) as f:
+                    prediction_result = predict_image_file(f, prediction_url)
+            else:
+                prediction_result = precomputed_results.get(file_name, RuntimeError("예측 결과가 없습니다."))
+                if isinstance(prediction_result, Exception):
+                    raise prediction_result
+            # 샘플 선별(sample_selector)에서 불확실도를 계산할 수 있도록 임계값 적용 전 점수를 보존합니다.
+            image_entry["raw_predictions"] = [
+                {"tagName": pred.get("tagName"), "probability": pred.get("probability")}
+                for pred in prediction_result.get("predictions", []) if pred.get("tagName") in label_info]
             current_image_annotations = []
             for pred in prediction_result.get("predictions", []):
                 tag_name = pred.get("tagName");
@@ -118,14 +342,74 @@ def convert_to_coco(image_folder, prediction_url, label_info):
             coco["annotations"].extend(current_image_annotations)
             print(f"  - 처리 완료: {file_name} (유효 예측 {len(current_image_annotations)}개 추가)")
         except Exception as e:
-            print(f"  - 예측 실패: {file_name}, 오류: {e}"); continue
+            print(f"  - 예측 실패: {file_name}, 오류: {e}"); failed_count += 1; continue
+    if failed_count:
+        print(f"⚠️ 예측에 실패한 이미지가 {failed_count}개 있습니다. (탐지 결과 없이 기록됨)")
     return coco
 
 
+def run_local_inference(image_folder, iteration, pipeline_config):
+    """
+    내보낸 ONNX 모델로 폴더 전체를 로컬 CPU에서 배치 추론합니다.
+    모델을 준비하지 못하거나 대부분의 이미지에서 실패하면 None을 반환하여 원격 예측으로 대체하고,
+    일부만 실패하면 그 이미지만 원격으로 다시 예측합니다.
+    """
+    import local_inference
+
+    run_data = storage.open_run(image_folder)
+    if run_data.archived:
+        print("⚠️ 압축된 실행은 로컬 추론을 지원하지 않아 원격 예측을 사용합니다.")
+        return None
+
+    # 모델을 내보내고 내려받기 전에 런타임이 설치되어 있는지 먼저 확인합니다.
+    missing = local_inference.missing_runtime_packages()
+    if missing:
+        print(f"⚠️ 로컬 추론에 필요한 패키지({', '.join(missing)})가 없어 원격 예측을 사용합니다.")
+        return None
+
+    print(f"\n🖥️ 로컬 추론 백엔드 사용 (Iteration: '{iteration['name']}')")
+    try:
+        model_dir = local_inference.ensure_model(TRAINING_ENDPOINT, TRAINING_KEY, PROJECT_ID, iteration["id"])
+        # 분류 모델처럼 출력이 맞지 않는 모델은 이미지마다 실패하므로 워커를 띄우기 전에 걸러냅니다.
+        local_inference.inspect_model(model_dir)
+    except Exception as e:
+        print(f"⚠️ 로컬 모델 준비 실패, 원격 예측으로 대체합니다: {e}")
+        return None
+
+    image_paths = [os.path.join(run_data.path, storage.IMAGE_FOLDER, f) for f in run_data.list_images()]
+    try:
+        results = local_inference.predict_images(model_dir, image_paths,
+                                                 workers=pipeline_config.local_inference_workers,
+                                                 batch_size=pipeline_config.local_inference_batch_size)
+    except Exception as e:
+        # 워커에서 모델 로드가 실패하면 프로세스 풀 전체가 깨지므로(BrokenProcessPool) 원격 예측으로 대체합니다.
+        print(f"⚠️ 로컬 추론 실패, 원격 예측으로 대체합니다: {e}")
+        return None
+
+    failed = [name for name, result in results.items() if isinstance(result, Exception)]
+    if len(failed) > len(results) * MAX_LOCAL_FAILURE_RATIO:
+        print(f"⚠️ 로컬 추론이 이미지 {len(results)}개 중 {len(failed)}개에서 실패하여 원격 예측으로 대체합니다. "
+              f"(첫 오류: {results[failed[0]]})")
+        return None
+    if failed:
+        print(f"  - 🔁 로컬 추론에 실패한 이미지 {len(failed)}개를 원격으로 다시 예측합니다...")
+        prediction_url = build_prediction_url(PROJECT_ID, iteration)
+        for name in failed:
+            try:
+                with run_data.open_image(name) as f:
+                    results[name] = predict_image_file(f, prediction_url)
+            except Exception as e:
+                results[name] = e
+    return results
+
+
 # --- 이 아래 run_prediction 함수가 수정되었습니다 ---
-def run_prediction(image_folder, output_coco_path):
-    if not all([PREDICTION_KEY, PREDICTION_ENDPOINT, TRAINING_KEY, TRAINING_ENDPOINT, PROJECT_ID]):
-        print("❌ .env 파일에 Azure 설정값이 모두 지정되지 않았습니다.");
+def run_prediction(image_folder, output_coco_path, pipeline_config=None):
+    pipeline_config = pipeline_config or config.load_config()
+    configure(pipeline_config)
+    missing = pipeline_config.missing_predictor_settings()
+    if missing:
+        print(f"❌ .env 파일에 Azure 설정값이 모두 지정되지 않았습니다. (누락: {', '.join(missing)})");
         return False
 
     # 1. Azure 프로젝트의 태그와 코드의 LABEL_INFO가 일치하는지 검증합니다.
@@ -134,10 +418,18 @@ def run_prediction(image_folder, output_coco_path):
         return False
 
     print(f"\n▶️ Azure Predictor 시작 (대상 폴더: {image_folder})")
-    prediction_url = get_latest_published_iteration_url(PROJECT_ID)
-    if not prediction_url: return False
+    latest_iteration = get_latest_published_iteration(PROJECT_ID)
+    if not latest_iteration: return False
+    prediction_url = build_prediction_url(PROJECT_ID, latest_iteration)
+
+    precomputed_results = None
+    if pipeline_config.prediction_backend == "local":
+        precomputed_results = run_local_inference(image_folder, latest_iteration, pipeline_config)
+    if precomputed_results is None and pipeline_config.prediction_input == "url":
+        precomputed_results = predict_by_urls(image_folder, PROJECT_ID, latest_iteration,
+                                              pipeline_config.prediction_concurrency)
 
-    coco_data = convert_to_coco(image_folder, prediction_url, LABEL_INFO)
+    coco_data = convert_to_coco(image_folder, prediction_url, LABEL_INFO, precomputed_results)
 
     os.makedirs(os.path.dirname(output_coco_path), exist_ok=True)
     with open(output_coco_path, "w", encoding="utf-8") as f:
@@ -149,23 +441,19 @@ def run_prediction(image_folder, output_coco_path):
 
 
 if __name__ == "__main__":
-    # ... (이전과 동일, 변경 없음)
     print("--- 예측 모듈 단독 테스트 실행 ---");
     print("크롤링으로 생성된 최신 데이터 폴더를 자동으로 탐색합니다...")
-    base_data_dir = "data";
-    latest_crawled_folder = None
-    if os.path.exists(base_data_dir):
-        all_subdirs = [d for d in os.listdir(base_data_dir) if
-                       os.path.isdir(os.path.join(base_data_dir, d)) and d.startswith("youtube_trending_")]
-        if all_subdirs: latest_crawled_folder = max(all_subdirs)
+    latest_crawled_folder = storage.find_latest_run_folder()
 
     if latest_crawled_folder:
-        image_folder_path = os.path.join(base_data_dir, latest_crawled_folder, "thumbnails")
+        image_folder_path = os.path.join(latest_crawled_folder, "thumbnails")
         print(f"✅ 최신 폴더 발견: {image_folder_path}")
-        output_path = os.path.join(base_data_dir, latest_crawled_folder, "predictions.json")
+        output_path = os.path.join(latest_crawled_folder, "predictions.json")
         if os.path.exists(output_path): print(f"🗑️ 기존 '{output_path}' 파일을 삭제합니다."); os.remove(output_path)
         if os.path.isdir(image_folder_path):
-            run_prediction(image_folder_path, output_path)
+            import profiling
+            with profiling.profiler_from_argv().profile_stage("predict", latest_crawled_folder):
+                run_prediction(image_folder_path, output_path)
         else:
             print(f"❌ 오류: 이미지 폴더 '{image_folder_path}'를 찾을 수 없습니다.")
     else:
@@ -6,25 +6,56 @@ import base64
 import requests
 import time
 from urllib.parse import quote
-from dotenv import load_dotenv
 
-# .env 파일에서 환경 변수 로드
-load_dotenv()
+import config
+import json_store
+import metadata_cache
+import sample_selector
+import storage
+import training_policy
 
 # --- 설정 (업로드/학습용 프로젝트 B의 정보 사용) ---
-TRAINING_KEY = os.getenv("AZURE_TRAINING_KEY")
-TRAINING_ENDPOINT = os.getenv("AZURE_TRAINING_ENDPOINT")
-PROJECT_ID = os.getenv("AZURE_UPLOADER_PROJECT_ID")
-PREDICTION_RESOURCE_ID = os.getenv("AZURE_PREDICTION_RESOURCE_ID")
-USE_ADVANCED_TRAINING = True
+# import 시점에는 비어 있으며, run_uploader()/run_training()이 configure()로 채웁니다.
+TRAINING_KEY = None
+TRAINING_ENDPOINT = None
+PROJECT_ID = None
+PREDICTION_RESOURCE_ID = None
 
 TRAIN_HEADERS = {"Training-Key": TRAINING_KEY, "Content-Type": "application/json"}
 
+# 서비스가 받아들인 업로드 상태. OKDuplicate는 이미 프로젝트에 있던 이미지이므로 새 학습 데이터로 세지 않습니다.
+ACCEPTED_STATUSES = ("OK", "OKDuplicate")
+# URL로 업로드한 이미지의 원본 URL 기록. 서비스의 originalImageUri는 서비스 자체 저장소 URI라서
+# 원본(ytimg) URL과 비교할 수 없으므로, 이 기록으로 이미 올린 썸네일을 걸러냅니다. (한 줄에 하나씩 추가만 합니다)
+UPLOAD_LEDGER_PATH = os.path.join(config.DATA_DIR, "upload_ledger.jsonl")
+
+
+def configure(pipeline_config):
+    """PipelineConfig 객체의 값으로 이 모듈의 Azure 설정을 채웁니다."""
+    global TRAINING_KEY, TRAINING_ENDPOINT, PROJECT_ID, PREDICTION_RESOURCE_ID, TRAIN_HEADERS
+    TRAINING_KEY = pipeline_config.training_key
+    TRAINING_ENDPOINT = pipeline_config.training_endpoint
+    PROJECT_ID = pipeline_config.uploader_project_id
+    PREDICTION_RESOURCE_ID = pipeline_config.prediction_resource_id
+    TRAIN_HEADERS = {"Training-Key": TRAINING_KEY, "Content-Type": "application/json"}
+    metadata_cache.configure(pipeline_config)
+
+
+def _configure_for_run(pipeline_config):
+    """설정을 적용하고 사용된 PipelineConfig를 반환합니다. 누락된 값이 있으면 안내 후 None을 반환합니다."""
+    pipeline_config = pipeline_config or config.load_config()
+    configure(pipeline_config)
+    missing = pipeline_config.missing_uploader_settings()
+    if missing:
+        print(f"❌ .env 파일에 Azure 설정값이 모두 지정되지 않았습니다. (누락: {', '.join(missing)})")
+        return None
+    return pipeline_config
+
 
 # --- 신규 함수: Azure 프로젝트의 기존 이미지 목록 조회 ---
-def get_existing_images_from_azure():
-    """Azure Custom Vision 프로젝트에 이미 업로드된 모든 이미지의 파일 이름을 가져옵니다."""
-    existing_images = set()
+def list_project_images():
+    """Azure Custom Vision 프로젝트에 업로드된 모든 이미지 정보를 가져옵니다. 실패 시 None을 반환합니다."""
+    project_images = []
     page_num = 0
 
     print("\n☁️ Azure에서 기존 이미지 목록을 확인합니다...")
@@ -33,24 +64,64 @@ def get_existing_images_from_azure():
         # get_tagged_images API는 페이징 처리가 필요 (한 번에 최대 256개씩 조회)
         url = f"{TRAINING_ENDPOINT}customvision/v3.3/training/projects/{PROJECT_ID}/images?take=256&skip={page_num * 256}"
         try:
-            res = requests.get(url, headers=TRAIN_HEADERS)
+            res = requests.get(url, headers=TRAIN_HEADERS, timeout=metadata_cache.FETCH_TIMEOUT_SECONDS)
             res.raise_for_status()
             images_on_page = res.json()
 
             if not images_on_page:
                 break  # 더 이상 가져올 이미지가 없으면 루프 종료
 
-            for image in images_on_page:
-                # Azure는 파일 이름을 'name' 필드에 저장
-                if 'name' in image:
-                    existing_images.add(image['name'])
+            project_images.extend(images_on_page)
             page_num += 1
 
         except requests.exceptions.RequestException as e:
             print(f"❌ 기존 이미지 목록 조회 실패: {e}")
             return None  # 오류 발생 시 None 반환
 
-    print(f"  - ✅ {len(existing_images)}개의 기존 이미지를 확인했습니다.")
+    print(f"  - ✅ {len(project_images)}개의 기존 이미지를 확인했습니다.")
+    return project_images
+
+
+def load_uploaded_sources():
+    """업로드 기록에서 현재 프로젝트에 이미 올린(또는 중복으로 확인된) 원본 URL 집합을 읽습니다."""
+    sources = set()
+    try:
+        with open(UPLOAD_LEDGER_PATH, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # 중단된 쓰기로 잘린 줄은 건너뜁니다.
+                if entry.get("project") == PROJECT_ID and entry.get("url"):
+                    sources.add(entry["url"])
+    except FileNotFoundError:
+        pass
+    return sources
+
+
+def record_uploaded_sources(entries):
+    """서비스가 받아들인 [(파일 이름, 원본 URL, 상태), ...]를 업로드 기록에 추가합니다."""
+    lines = [json.dumps({"project": PROJECT_ID, "url": image_url, "name": fname, "status": status,
+                         "uploaded_at": time.time()}, ensure_ascii=False) + "\n"
+             for fname, image_url, status in entries if image_url and status in ACCEPTED_STATUSES]
+    if not lines:
+        return
+    # 분산 워커가 동시에 기록하므로 잠금을 건 채로 추가합니다.
+    with json_store.file_lock(UPLOAD_LEDGER_PATH):
+        with open(UPLOAD_LEDGER_PATH, "a", encoding="utf-8") as f:
+            f.writelines(lines)
+
+
+def get_existing_images_from_azure(project_images=None):
+    """Azure Custom Vision 프로젝트에 이미 업로드된 이미지의 파일 이름과, 업로드 기록에 남은 원본 URL을 가져옵니다."""
+    if project_images is None:
+        project_images = list_project_images()
+        if project_images is None:
+            return None
+    # 파일로 올린 이미지는 'name' 필드에 파일 이름이 남지만, URL로 올린 이미지는 원본 URL이 남지 않으므로
+    # 로컬 업로드 기록의 URL을 함께 사용합니다.
+    existing_images = {image['name'] for image in project_images if image.get('name')}
+    existing_images.update(load_uploaded_sources())
     return existing_images
 
 
@@ -60,10 +131,15 @@ def sync_and_get_tags(required_tag_names):
     """
     print("\n🔄 Azure 프로젝트와 태그 동기화를 시작합니다...")
     get_tags_url = f"{TRAINING_ENDPOINT}customvision/v3.3/training/projects/{PROJECT_ID}/tags"
-    try:
-        res = requests.get(get_tags_url, headers=TRAIN_HEADERS)
+
+    def fetch_tags():
+        res = requests.get(get_tags_url, headers=TRAIN_HEADERS, timeout=metadata_cache.FETCH_TIMEOUT_SECONDS)
         res.raise_for_status()
-        tag_map = {tag['name']: tag['id'] for tag in res.json()}
+        return res.json()
+
+    try:
+        tag_map = {tag['name']: tag['id'] for tag in metadata_cache.get_or_fetch(metadata_cache.tags_key(PROJECT_ID),
+                                                                                  fetch_tags)}
         print(f"  - 현재 프로젝트에 {len(tag_map)}개의 태그가 있습니다: {list(tag_map.keys())}")
     except requests.exceptions.RequestException as e:
         print(f"❌ 기존 태그 목록 조회 실패: {e}")
@@ -78,6 +154,7 @@ def sync_and_get_tags(required_tag_names):
                 res.raise_for_status()
                 new_tag_info = res.json()
                 tag_map[new_tag_info['name']] = new_tag_info['id']
+                metadata_cache.invalidate(metadata_cache.tags_key(PROJECT_ID))
                 print(f"  ✅ 새로운 태그 생성 성공: {new_tag_info['name']}")
             except requests.exceptions.RequestException as e:
                 print(f"  ❌ 태그 '{tag_name}' 생성 실패: {e}")
@@ -87,14 +164,26 @@ def sync_and_get_tags(required_tag_names):
     return tag_map
 
 
-def get_next_iteration_name():
-    # ... (이전과 동일, 변경 없음)
+def list_iterations():
+    """프로젝트 B의 Iteration 목록을 메타데이터 캐시를 거쳐 가져옵니다. 실패 시 None을 반환합니다."""
     url = f"{TRAINING_ENDPOINT}customvision/v3.3/training/projects/{PROJECT_ID}/iterations"
-    try:
-        res = requests.get(url, headers=TRAIN_HEADERS);
+
+    def fetch_iterations():
+        res = requests.get(url, headers=TRAIN_HEADERS, timeout=metadata_cache.FETCH_TIMEOUT_SECONDS);
         res.raise_for_status();
-        iterations = res.json()
-    except requests.exceptions.RequestException:
+        return res.json()
+
+    try:
+        return metadata_cache.get_or_fetch(metadata_cache.iterations_key(PROJECT_ID), fetch_iterations)
+    except requests.exceptions.RequestException as e:
+        print(f"❌ Iteration 목록 조회 실패: {e}")
+        return None
+
+
+def get_next_iteration_name(iterations=None):
+    if iterations is None:
+        iterations = list_iterations()
+    if iterations is None:
         return "Iteration-1"
     max_num = 0
     for it in iterations:
@@ -127,39 +216,141 @@ def convert_coco_to_azure_format(coco_data, tag_map):
     return uploads
 
 
-def upload_images_to_azure(image_folder, uploads):
-    # ... (이전과 동일, 변경 없음)
+def send_url_batch(batch, sent_count, total_count):
+    """
+    (파일 이름, URL, 영역) 묶음을 URL 기반 배치 API로 업로드합니다.
+    반환값: {파일 이름: 서비스 상태} (요청 자체가 실패하면 모두 "Error")
+    """
+    url = f"{TRAINING_ENDPOINT}customvision/v3.3/training/projects/{PROJECT_ID}/images/urls"
+    print(f"🔗 URL 업로드 중... [{sent_count + 1}–{sent_count + len(batch)} / {total_count}]")
+    body = {"images": [{"url": image_url, "regions": regions} for _, image_url, regions in batch]}
+    try:
+        res = requests.post(url, headers=TRAIN_HEADERS, json=body, timeout=180);
+        res.raise_for_status();
+        summary = res.json()
+    except requests.exceptions.RequestException as e:
+        print(f"  - ❌ URL 배치 업로드 실패: {e}")
+        return {fname: "Error" for fname, _, _ in batch}
+
+    status_by_url = {img.get("sourceUrl"): img.get("status") for img in summary.get("images", [])}
+    statuses = {fname: status_by_url.get(image_url, "Error") for fname, image_url, _ in batch}
+    record_uploaded_sources([(fname, image_url, statuses[fname]) for fname, image_url, _ in batch])
+    _print_status_counts("URL 배치 업로드 완료", statuses)
+    return statuses
+
+
+def _print_status_counts(title, statuses):
+    new = sum(1 for status in statuses.values() if status == "OK")
+    duplicates = sum(1 for status in statuses.values() if status == "OKDuplicate")
+    print(f"  - {title} (신규 {new}개, 중복 {duplicates}개, 실패 {len(statuses) - new - duplicates}개)")
+
+
+def upload_images_by_url(uploads, image_urls):
+    """
+    URL이 있는 이미지는 URL로 업로드합니다.
+    반환값: ({파일 이름: 서비스가 받아들인 상태}, 파일 업로드로 대체해야 하는 {파일 이름: 영역})
+    """
+    entries = [(fname, image_urls[fname], regions) for fname, regions in uploads.items() if fname in image_urls]
+    fallback = {fname: regions for fname, regions in uploads.items() if fname not in image_urls}
+    accepted = {}
+    for start in range(0, len(entries), 64):
+        batch = entries[start:start + 64]
+        statuses = send_url_batch(batch, start, len(entries))
+        for fname, _, regions in batch:
+            if statuses[fname] in ACCEPTED_STATUSES:
+                accepted[fname] = statuses[fname]
+            else:
+                fallback[fname] = regions
+    return accepted, fallback
+
+
+def upload_images_to_azure(image_folder, uploads, image_urls=None):
+    """
+    image_urls({파일 이름: 원본 URL})가 주어지면 URL 업로드를 먼저 시도하고,
+    URL이 없거나 서비스가 거부한 이미지만 파일(base64)로 업로드합니다.
+    반환값: {파일 이름: 서비스 상태} ("OK"인 이미지만 새로 추가된 학습 데이터입니다)
+    """
+    statuses = {}
+    if image_urls:
+        statuses, uploads = upload_images_by_url(uploads, image_urls)
+        if uploads:
+            print(f"📁 URL로 업로드하지 못한 {len(uploads)}개 이미지를 파일로 업로드합니다.")
+    if not uploads:
+        return statuses
+    run_data = storage.open_run(image_folder)
     batch, total_sent = [], 0;
     total_images = len(uploads)
     for fname, regions in list(uploads.items()):
-        fpath = os.path.join(image_folder, fname)
-        if not os.path.exists(fpath): continue
-        with open(fpath, "rb") as f:
+        if not run_data.has_image(fname):
+            statuses[fname] = "Missing"; continue
+        with run_data.open_image(fname) as f:
             b64_content = base64.b64encode(f.read()).decode()
         batch.append({"name": fname, "contents": b64_content, "regions": regions})
-        if len(batch) >= 64: total_sent = send_batch(batch, total_sent, total_images); batch = []
-    if batch: send_batch(batch, total_sent, total_images)
+        if len(batch) >= 64:
+            statuses.update(send_batch(batch, total_sent, total_images, image_urls))
+            total_sent += len(batch); batch = []
+    if batch: statuses.update(send_batch(batch, total_sent, total_images, image_urls))
+    return statuses
 
 
-def send_batch(batch, sent_count, total_count):
-    # ... (이전과 동일, 변경 없음)
+def upload_single_image(image_folder, file_name, regions, image_url=None):
+    """
+    분산 워커용: 이미지 한 장을 URL(가능하면) 또는 파일로 업로드합니다.
+    반환값: {"method": "url"/"file", "status": "OK"/"OKDuplicate"}. 거부되면 예외를 발생시켜 작업을 재시도하게 합니다.
+    같은 이미지가 이미 있으면 서비스가 OKDuplicate를 반환하므로, 같은 작업이 다시 실행되어도 안전합니다.
+    """
+    if image_url:
+        status = send_url_batch([(file_name, image_url, regions)], 0, 1)[file_name]
+        if status in ACCEPTED_STATUSES:
+            return {"method": "url", "status": status}
+
+    with storage.open_run(image_folder).open_image(file_name) as f:
+        b64_content = base64.b64encode(f.read()).decode()
+    status = send_batch([{"name": file_name, "contents": b64_content, "regions": regions}], 0, 1,
+                        {file_name: image_url} if image_url else None)[file_name]
+    if status not in ACCEPTED_STATUSES:
+        raise RuntimeError(f"이미지 업로드가 거부되었습니다: {status}")
+    return {"method": "file", "status": status}
+
+
+def send_batch(batch, sent_count, total_count, image_urls=None):
+    """
+    파일(base64) 묶음을 업로드하고 {파일 이름: 서비스 상태}를 반환합니다. (요청 자체가 실패하면 모두 "Error")
+    image_urls가 주어지면 받아들여진 이미지의 원본 URL을 업로드 기록에 남깁니다.
+    """
     url = f"{TRAINING_ENDPOINT}customvision/v3.3/training/projects/{PROJECT_ID}/images/files"
     print(f"📤 업로드 중... [{sent_count + 1}–{sent_count + len(batch)} / {total_count}]")
     try:
         res = requests.post(url, headers=TRAIN_HEADERS, json={"images": batch}, timeout=180);
         res.raise_for_status();
-        print("  - 배치 업로드 성공.")
+        results = res.json().get("images", [])
     except requests.exceptions.RequestException as e:
         print(f"  - ❌ 배치 업로드 실패: {e}")
-    return sent_count + len(batch)
-
-
-def train_new_iteration(iteration_name):
-    # ... (이전과 동일, 변경 없음)
-    url = f"{TRAINING_ENDPOINT}customvision/v3.3/training/projects/{PROJECT_ID}/train?advancedTraining={'true' if USE_ADVANCED_TRAINING else 'false'}"
+        return {item["name"]: "Error" for item in batch}
+
+    # 결과의 sourceUrl에는 업로드한 파일 이름이 담기며, 없으면 요청 순서대로 대응시킵니다.
+    names = [item["name"] for item in batch]
+    status_by_name = {img.get("sourceUrl"): img.get("status") for img in results if img.get("sourceUrl") in names}
+    if not status_by_name and len(results) == len(batch):
+        status_by_name = {name: img.get("status") for name, img in zip(names, results)}
+    statuses = {name: status_by_name.get(name, "Error") for name in names}
+    if image_urls:
+        record_uploaded_sources([(name, image_urls.get(name), statuses[name]) for name in names])
+    _print_status_counts("배치 업로드 완료", statuses)
+    return statuses
+
+
+def train_new_iteration(iteration_name, advanced=False, budget_hours=0):
+    """새 Iteration 학습을 요청합니다. 기본값은 비용이 적은 일반(Regular) 학습입니다."""
+    url = f"{TRAINING_ENDPOINT}customvision/v3.3/training/projects/{PROJECT_ID}/train"
+    if advanced:
+        url += f"?trainingType=Advanced&reservedBudgetInHours={budget_hours}"
+    else:
+        url += "?trainingType=Regular"
     res = requests.post(url, headers=TRAIN_HEADERS)
+    metadata_cache.invalidate(metadata_cache.iterations_key(PROJECT_ID))
     if res.ok:
-        print(f"🧠 학습 요청 성공: '{iteration_name}'"); return res.json()
+        print(f"🧠 학습 요청 성공: '{iteration_name}' ({'고급' if advanced else '일반'} 학습)"); return res.json()
     else:
         print(f"❌ 학습 요청 실패 ({res.status_code}): {res.text}"); return None
 
@@ -175,8 +366,10 @@ def wait_for_training_completion(iteration_id, timeout=3600, interval=30):
             iteration_data = res.json();
             status = iteration_data["status"]
             print(f"⏳ 학습 상태 확인: {status} (경과 시간: {int(time.time() - start_time)}초)")
-            if status == "Completed": return True
-            if status in ["Failed", "Canceled"]: return False
+            if status in ["Completed", "Failed", "Canceled"]:
+                # 학습 상태가 바뀌었으므로 캐시된 Iteration 목록을 버립니다.
+                metadata_cache.invalidate(metadata_cache.iterations_key(PROJECT_ID))
+                return status == "Completed"
             time.sleep(interval)
         except requests.exceptions.RequestException as e:
             print(f"  - 학습 상태 확인 중 오류 발생: {e}"); time.sleep(interval)
@@ -189,40 +382,165 @@ def publish_iteration(iteration_id, iteration_name):
     encoded_iteration_name = quote(iteration_name)
     url = f"{TRAINING_ENDPOINT}customvision/v3.3/training/projects/{PROJECT_ID}/iterations/{iteration_id}/publish?publishName={encoded_iteration_name}&predictionId={PREDICTION_RESOURCE_ID}"
     res = requests.post(url, headers=TRAIN_HEADERS)
+    metadata_cache.invalidate(metadata_cache.iterations_key(PROJECT_ID))
     if res.ok:
         print(f"🚀 게시 성공: '{iteration_name}'")
     else:
         print(f"❌ 게시 실패 ({res.status_code}): {res.text}")
 
 
-# --- 이 아래 run_uploader 함수가 수정되었습니다 ---
-def run_uploader(image_folder, coco_file_path):
-    """COCO 파일과 이미지 폴더를 기반으로 Azure 업로드 및 학습 파이프라인을 실행합니다."""
-    if not all([TRAINING_KEY, TRAINING_ENDPOINT, PROJECT_ID, PREDICTION_RESOURCE_ID]):
-        print("❌ .env 파일에 Azure 설정값이 모두 지정되지 않았습니다.");
+def unpublish_iteration(iteration_id):
+    url = f"{TRAINING_ENDPOINT}customvision/v3.3/training/projects/{PROJECT_ID}/iterations/{iteration_id}/publish"
+    res = requests.delete(url, headers=TRAIN_HEADERS)
+    metadata_cache.invalidate(metadata_cache.iterations_key(PROJECT_ID))
+    if not res.ok:
+        print(f"  - ❌ 게시 취소 실패 ({res.status_code}): {res.text}")
+    return res.ok
+
+
+def delete_iteration(iteration_id):
+    url = f"{TRAINING_ENDPOINT}customvision/v3.3/training/projects/{PROJECT_ID}/iterations/{iteration_id}"
+    res = requests.delete(url, headers=TRAIN_HEADERS)
+    metadata_cache.invalidate(metadata_cache.iterations_key(PROJECT_ID))
+    if not res.ok:
+        print(f"  - ❌ Iteration 삭제 실패 ({res.status_code}): {res.text}")
+    return res.ok
+
+
+def retire_old_iterations(retention, keep_ids=()):
+    """최신 retention개를 제외한 오래된 Iteration을 게시 취소 후 삭제합니다."""
+    iterations = list_iterations()
+    if iterations is None:
+        return
+    to_retire = training_policy.iterations_to_retire(iterations, retention, keep_ids)
+    if not to_retire:
+        return
+    print(f"\n🧹 보존 개수({retention}개)를 초과한 오래된 Iteration {len(to_retire)}개를 정리합니다...")
+    for it in to_retire:
+        if it.get("publishName") and not unpublish_iteration(it["id"]):
+            continue
+        if delete_iteration(it["id"]):
+            print(f"  - 🗑️ 삭제 완료: '{it['name']}'")
+
+
+def _published_iteration_ids(iterations):
+    return {it["id"] for it in iterations or [] if it.get("publishName")}
+
+
+def train_and_publish(decision, policy, iterations=None):
+    """
+    정책 결정에 따라 새 Iteration 학습을 요청하고, 완료되면 게시 후 오래된 Iteration을 정리합니다.
+    프로젝트의 Iteration 개수 한도에 걸려 학습 요청이 거부되지 않도록, 요청 전에 새 Iteration이 들어갈
+    자리를 남기고 정리하며, 그래도 요청이 실패하면 한 번 더 정리한 뒤 다시 요청합니다.
+    """
+    if iterations is None:
+        iterations = list_iterations() or []
+    # 정리로 번호가 큰 Iteration이 사라지기 전에 다음 이름을 정합니다.
+    iteration_name = get_next_iteration_name(iterations)
+
+    # 새 Iteration 자리를 비워 둡니다. (보존 개수가 1이어도 게시 중인 Iteration은 남깁니다)
+    pre_retention = max(policy.iteration_retention - 1, 1) if policy.iteration_retention > 0 else 0
+    retire_old_iterations(pre_retention, keep_ids=_published_iteration_ids(iterations))
+
+    iteration_info = train_new_iteration(iteration_name, decision.advanced, decision.budget_hours)
+    if iteration_info is None and pre_retention > 0:
+        print("🧹 학습 요청이 거부되어 오래된 Iteration을 정리한 뒤 다시 요청합니다.")
+        retire_old_iterations(pre_retention, keep_ids=_published_iteration_ids(list_iterations() or iterations))
+        iteration_info = train_new_iteration(iteration_name, decision.advanced, decision.budget_hours)
+
+    if iteration_info:
+        iteration_id = iteration_info["id"]
+        if wait_for_training_completion(iteration_id):
+            publish_iteration(iteration_id, iteration_name)
+            retire_old_iterations(policy.iteration_retention, keep_ids={iteration_id})
+        else:
+            print("⚠️ 학습이 완료되지 않아 게시를 생략합니다.")
+    return iteration_info is not None
+
+
+def maybe_train(policy, project_images, uploaded_images=0, uploaded_regions=0, force=False):
+    """
+    마지막 학습 이후 쌓인 데이터를 정책과 비교하여 필요할 때만 학습합니다.
+    project_images는 이번 업로드 전에 조회한 이미지 목록이며, 이번 업로드 분은 별도로 더합니다.
+    """
+    iterations = list_iterations()
+    if iterations is None:
+        print("❌ Iteration 정보를 가져오지 못해 학습을 건너뜁니다.")
         return False
 
-    print(f"\n▶️ Azure Uploader 시작 (대상 파일: {coco_file_path})")
-    if not os.path.exists(coco_file_path):
-        print(f"❌ COCO 파일({coco_file_path})을 찾을 수 없습니다.");
+    trained_at = training_policy.last_trained_at(iterations)
+    untrained = [img for img in project_images
+                 if trained_at is None
+                 or (training_policy.parse_azure_datetime(img.get("created")) or trained_at) > trained_at]
+    new_images = len(untrained) + uploaded_images
+    new_regions = sum(len(img.get("regions") or []) for img in untrained) + uploaded_regions
+    total_images = len(project_images) + uploaded_images
+
+    decision = training_policy.decide_training(policy, new_images, new_regions, total_images, trained_at)
+    if force and not decision.should_train:
+        decision = training_policy.TrainingDecision(True, False, 0, f"강제 학습 요청 ({decision.reason})")
+    print(f"\n🧭 학습 정책: {'학습 진행' if decision.should_train else '학습 생략'} - {decision.reason}")
+    if not decision.should_train:
+        return True
+    return train_and_publish(decision, policy, iterations)
+
+
+def run_training(pipeline_config=None, force=False):
+    """업로드 없이 프로젝트 B의 현재 데이터로 학습 정책을 평가하고 학습 및 게시를 수행합니다."""
+    pipeline_config = _configure_for_run(pipeline_config)
+    if pipeline_config is None:
         return False
+    print("\n▶️ Azure 학습 시작 (업로드 없이 현재 데이터로 학습)")
+    project_images = list_project_images()
+    if project_images is None:
+        return False
+    return maybe_train(training_policy.TrainingPolicy.from_config(pipeline_config), project_images, force=force)
 
-    with open(coco_file_path, 'r', encoding='utf-8') as f:
-        coco_data = json.load(f)
+
+def prepare_upload_plan(image_folder, coco_file_path, pipeline_config):
+    """
+    기존 이미지 제외, 샘플 선별, 태그 동기화를 거쳐 업로드 계획을 만듭니다.
+    반환값: {"policy", "project_images", "uploads": {파일 이름: 영역}, "image_urls"} (업로드할 것이 없으면 uploads는 비어 있음)
+    오류가 발생하면 None을 반환합니다.
+    """
+    print(f"\n▶️ Azure Uploader 시작 (대상 파일: {coco_file_path})")
+    if os.path.exists(coco_file_path):
+        with open(coco_file_path, 'r', encoding='utf-8') as f:
+            coco_data = json.load(f)
+    else:
+        # 압축된 실행이라면 압축본 안의 predictions.json을 읽습니다.
+        try:
+            run_data = storage.open_run(image_folder)
+        except FileNotFoundError:
+            run_data = None
+        coco_name = os.path.basename(coco_file_path)
+        if run_data is None or not run_data.has_file(coco_name):
+            print(f"❌ COCO 파일({coco_file_path})을 찾을 수 없습니다.");
+            return None
+        with run_data.open_file(coco_name) as f:
+            coco_data = json.load(f)
+
+    policy = training_policy.TrainingPolicy.from_config(pipeline_config)
+    plan = {"policy": policy, "project_images": None, "uploads": {}, "image_urls": None}
 
     # 1. Azure에서 기존 이미지 목록을 가져옵니다.
-    existing_images_on_azure = get_existing_images_from_azure()
-    if existing_images_on_azure is None:
+    project_images = list_project_images()
+    if project_images is None:
         print("❌ Azure에서 이미지 목록을 가져오지 못해 업로드를 중단합니다.");
-        return False
+        return None
+    plan["project_images"] = project_images
+    existing_images_on_azure = get_existing_images_from_azure(project_images)
 
     # 2. 로컬 JSON 파일에 있는 이미지 목록과 비교하여, 업로드할 새로운 이미지 목록을 만듭니다.
+    #    파일 이름 또는 원본 URL 중 하나라도 이미 프로젝트에 있으면 기존 이미지로 봅니다.
     all_local_images = {img['file_name'] for img in coco_data.get('images', [])}
-    new_images_to_upload = all_local_images - existing_images_on_azure
+    new_images_to_upload = {img['file_name'] for img in coco_data.get('images', [])
+                            if img['file_name'] not in existing_images_on_azure
+                            and img.get('coco_url') not in existing_images_on_azure}
 
     if not new_images_to_upload:
-        print("\n✅ 새로운 이미지가 없습니다. 업로드 및 학습을 건너뜁니다.")
-        return True
+        print("\n✅ 새로운 이미지가 없습니다. 업로드를 건너뜁니다.")
+        return plan
 
     print(f"\n🆕 총 {len(all_local_images)}개 이미지 중 {len(new_images_to_upload)}개의 새로운 이미지를 업로드합니다.")
 
@@ -240,51 +558,72 @@ def run_uploader(image_folder, coco_file_path):
 
     if not filtered_coco.get("annotations"):
         print("⚠️ 새로운 이미지에 대한 주석(annotation) 데이터가 없어 업로드를 건너뜁니다.");
-        return True
+        return plan
+
+    # 4. 불확실도/희소성/다양성 기준으로 이번 실행에서 업로드할 이미지를 선별합니다.
+    filtered_coco, decisions = sample_selector.select_samples(filtered_coco, image_folder,
+                                                              pipeline_config.selection_budget)
+    report_dir = os.path.dirname(coco_file_path)
+    report_path = os.path.join(report_dir, "selection_report.json") if os.path.isdir(report_dir) else None
+    sample_selector.report_selection(decisions, pipeline_config.selection_budget, report_path)
+    if not filtered_coco["images"]:
+        print("⚠️ 선별된 이미지가 없어 업로드를 건너뜁니다.");
+        return plan
 
     required_tag_names = [cat['name'] for cat in filtered_coco.get('categories', [])]
     tag_map = sync_and_get_tags(required_tag_names)
     if tag_map is None:
         print("❌ 태그 맵을 가져오지 못해 업로드를 중단합니다.");
-        return False
+        return None
 
     uploads = convert_coco_to_azure_format(filtered_coco, tag_map)
     if not uploads:
         print("⚠️ 업로드할 유효한 이미지가 없습니다.");
-        return True
+        return plan
 
-    upload_images_to_azure(image_folder, uploads)
+    plan["uploads"] = uploads
+    if pipeline_config.upload_mode == "url":
+        plan["image_urls"] = {img["file_name"]: img["coco_url"]
+                              for img in filtered_coco["images"] if img.get("coco_url")}
+    return plan
 
-    iteration_name = get_next_iteration_name()
-    iteration_info = train_new_iteration(iteration_name)
 
-    if iteration_info:
-        iteration_id = iteration_info["id"]
-        if wait_for_training_completion(iteration_id):
-            publish_iteration(iteration_id, iteration_name)
-        else:
-            print("⚠️ 학습이 완료되지 않아 게시를 생략합니다.")
+# --- 이 아래 run_uploader 함수가 수정되었습니다 ---
+def run_uploader(image_folder, coco_file_path, pipeline_config=None):
+    """COCO 파일과 이미지 폴더를 기반으로 Azure 업로드 및 학습 파이프라인을 실행합니다."""
+    pipeline_config = _configure_for_run(pipeline_config)
+    if pipeline_config is None:
+        return False
+
+    plan = prepare_upload_plan(image_folder, coco_file_path, pipeline_config)
+    if plan is None:
+        return False
+
+    uploads = plan["uploads"]
+    statuses = upload_images_to_azure(image_folder, uploads, plan["image_urls"]) if uploads else {}
+
+    # 5. 학습 정책에 따라 학습 여부와 방식(일반/고급)을 결정합니다.
+    #    이번에 새로 추가된(OK) 이미지만 새 데이터로 셉니다. (중복/실패 제외)
+    added = [fname for fname, status in statuses.items() if status == "OK"]
+    uploaded_regions = sum(len(uploads[fname]) for fname in added)
+    maybe_train(plan["policy"], plan["project_images"], len(added), uploaded_regions)
     return True
 
 
 if __name__ == "__main__":
-    # ... (이전과 동일, 변경 없음)
     print("--- 업로더 모듈 단독 테스트 실행 ---")
     print("크롤링으로 생성된 최신 데이터 폴더와 JSON 파일을 자동으로 탐색합니다...")
-    base_data_dir = 'data';
-    latest_crawled_folder = None
-    if os.path.exists(base_data_dir):
-        all_subdirs = [d for d in os.listdir(base_data_dir) if
-                       os.path.isdir(os.path.join(base_data_dir, d)) and d.startswith('youtube_trending_')]
-        if all_subdirs: latest_crawled_folder = max(all_subdirs)
+    latest_crawled_folder = storage.find_latest_run_folder()
 
     if latest_crawled_folder:
-        image_folder_path = os.path.join(base_data_dir, latest_crawled_folder, 'thumbnails')
-        json_file_path = os.path.join(base_data_dir, latest_crawled_folder, 'predictions.json')
+        image_folder_path = os.path.join(latest_crawled_folder, 'thumbnails')
+        json_file_path = os.path.join(latest_crawled_folder, 'predictions.json')
         print(f"✅ 최신 이미지 폴더 발견: {image_folder_path}");
         print(f"✅ 최신 JSON 파일 발견: {json_file_path}")
         if os.path.isdir(image_folder_path) and os.path.isfile(json_file_path):
-            run_uploader(image_folder_path, json_file_path)
+            import profiling
+            with profiling.profiler_from_argv().profile_stage("upload", latest_crawled_folder):
+                run_uploader(image_folder_path, json_file_path)
         else:
             if not os.path.isdir(image_folder_path): print(f"❌ 오류: 이미지 폴더를 찾을 수 없습니다: {image_folder_path}")
             if not os.path.isfile(json_file_path): print(f"❌ 오류: '{json_file_path}' 파일을 찾을 수 없습니다.")
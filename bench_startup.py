@@ -0,0 +1,61 @@
+# bench_startup.py
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# --- CLI 콜드 스타트 예산 ---
+# 'python main.py status' 한 번(인터프리터 기동 포함)에 허용되는 최대 시간(밀리초, 중앙값 기준)
+COLD_START_BUDGET_MS = 150
+REPEAT = 7
+
+# main.py를 임포트했을 때 절대 함께 로드되면 안 되는 무거운 모듈
+HEAVY_MODULES = ["selenium", "pandas", "PIL", "requests", "schedule", "crawler", "azure_predictor",
+                 "azure_uploader"]
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def measure_command(args, repeat=REPEAT):
+    """명령을 여러 번 실행하여 각 실행의 소요 시간(ms) 목록을 반환합니다."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + args, cwd=PROJECT_DIR, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL, check=False)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def find_eager_heavy_imports():
+    """main.py 임포트 직후 로드된 무거운 모듈 목록을 반환합니다."""
+    probe = ("import sys, main; "
+             f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    result = subprocess.run([sys.executable, "-c", probe], cwd=PROJECT_DIR, capture_output=True, text=True)
+    return [m for m in result.stdout.strip().split(",") if m]
+
+
+def run_benchmark():
+    print("--- CLI 콜드 스타트 벤치마크 ---")
+    baseline = statistics.median(measure_command(["-c", "pass"]))
+    status = statistics.median(measure_command(["main.py", "status"]))
+    print(f"  - 인터프리터 기동:      {baseline:7.1f} ms")
+    print(f"  - main.py status:      {status:7.1f} ms (예산 {COLD_START_BUDGET_MS} ms)")
+
+    ok = True
+    eager = find_eager_heavy_imports()
+    if eager:
+        print(f"❌ main.py 임포트 시 무거운 모듈이 함께 로드됩니다: {eager}")
+        ok = False
+    if status > COLD_START_BUDGET_MS:
+        print(f"❌ 콜드 스타트 예산 초과: {status:.1f} ms > {COLD_START_BUDGET_MS} ms")
+        ok = False
+    if ok:
+        print("✅ 콜드 스타트 예산을 만족합니다.")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_benchmark() else 1)
@@ -0,0 +1,154 @@
+# config.py
+
+import os
+from dataclasses import dataclass
+
+# 크롤링 결과가 저장되는 기본 데이터 폴더
+DATA_DIR = "data"
+RUN_FOLDER_PREFIX = "youtube_trending_"
+# 분산 실행에서 코디네이터와 워커가 공유하는 작업 큐 파일 (CLI 기본값이 sqlite3를 불러오지 않도록 여기에 둡니다)
+WORK_QUEUE_PATH = os.path.join(DATA_DIR, "work_queue.sqlite3")
+
+
+@dataclass(frozen=True)
+class PipelineConfig:
+    """
+    .env 파일과 환경 변수에서 읽어 온 파이프라인 설정값을 한곳에 모아 둔 객체입니다.
+    각 모듈은 import 시점이 아니라 실제 실행 시점에 이 객체를 전달받아 사용합니다.
+    """
+    # --- 학습(Training) 리소스 정보 ---
+    training_key: str = None
+    training_endpoint: str = None
+    # --- 예측(Prediction) 리소스 정보 ---
+    prediction_key: str = None
+    prediction_endpoint: str = None
+    prediction_resource_id: str = None
+    # --- 프로젝트 ID (A: 예측용, B: 업로드/학습용) ---
+    prediction_project_id: str = None
+    uploader_project_id: str = None
+    # --- 예측 백엔드 ---
+    # "remote": 게시된 Iteration URL로 원격 예측, "local": 내보낸 ONNX 모델로 로컬 CPU 추론
+    prediction_backend: str = "remote"
+    # 원격 예측 입력: "url"(크롤러가 기록한 썸네일 URL 전달, 실패 시 파일 바이트로 재시도) 또는 "file"
+    prediction_input: str = "url"
+    prediction_concurrency: int = 8
+    local_inference_workers: int = 0  # 0이면 CPU 코어 수만큼 사용
+    local_inference_batch_size: int = 16
+    # --- 업로드 방식 ---
+    # "url": 크롤러가 기록한 썸네일 URL로 업로드(거부된 이미지만 파일 업로드), "file": 항상 파일(base64) 업로드
+    upload_mode: str = "url"
+    # --- 실행 데이터 보존 ---
+    storage_keep_recent_runs: int = 3  # 압축하지 않고 폴더로 남겨 둘 최근 실행 수
+    storage_max_age_days: int = 90  # 이보다 오래된 압축본은 삭제 (0이면 기간 제한 없음)
+    storage_max_disk_mb: int = 0  # 실행 데이터 전체 용량 한도 (0이면 용량 제한 없음)
+    # --- 메타데이터 캐시 유효 시간(초) ---
+    metadata_ttl_tags: int = 24 * 3600
+    metadata_ttl_iterations: int = 3600
+    # --- 샘플 선별 ---
+    # 한 번의 실행에서 업로드할 최대 이미지 수 (0이면 제한 없음)
+    selection_budget: int = 0
+    # --- 학습 정책 (training_policy.TrainingPolicy 참고) ---
+    train_min_new_images: int = 20
+    train_min_new_regions: int = 50
+    train_max_days_since_train: int = 7
+    train_advanced_growth_ratio: float = 0.3
+    train_advanced_budget_hours: int = 1
+    iteration_retention: int = 5
+    # --- 프로파일링 (--profile) ---
+    # 단계의 실행 시간/최대 메모리가 기준값보다 이 비율 이상 늘면 성능 회귀로 표시합니다.
+    profile_regression_threshold: float = 0.5
+
+    def missing_predictor_settings(self):
+        """예측기 실행에 필요하지만 비어 있는 설정 이름 목록을 반환합니다."""
+        required = {
+            "AZURE_PREDICTION_KEY": self.prediction_key,
+            "AZURE_PREDICTION_ENDPOINT": self.prediction_endpoint,
+            "AZURE_TRAINING_KEY": self.training_key,
+            "AZURE_TRAINING_ENDPOINT": self.training_endpoint,
+            "AZURE_PREDICTION_PROJECT_ID": self.prediction_project_id,
+        }
+        return [name for name, value in required.items() if not value]
+
+    def missing_uploader_settings(self):
+        """업로더 실행에 필요하지만 비어 있는 설정 이름 목록을 반환합니다."""
+        required = {
+            "AZURE_TRAINING_KEY": self.training_key,
+            "AZURE_TRAINING_ENDPOINT": self.training_endpoint,
+            "AZURE_UPLOADER_PROJECT_ID": self.uploader_project_id,
+            "AZURE_PREDICTION_RESOURCE_ID": self.prediction_resource_id,
+        }
+        return [name for name, value in required.items() if not value]
+
+
+_loaded_config = None
+
+
+def _get_int_env(name, default):
+    """정수형 환경 변수를 읽습니다. 값이 없거나 잘못되면 기본값을 사용합니다."""
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        print(f"⚠️ 환경 변수 {name}의 값 '{value}'이(가) 정수가 아니므로 기본값 {default}을(를) 사용합니다.")
+        return default
+
+
+def _get_float_env(name, default):
+    """실수형 환경 변수를 읽습니다. 값이 없거나 잘못되면 기본값을 사용합니다."""
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        print(f"⚠️ 환경 변수 {name}의 값 '{value}'이(가) 숫자가 아니므로 기본값 {default}을(를) 사용합니다.")
+        return default
+
+
+def load_config(reload=False):
+    """
+    .env 파일을 한 번만 읽어 PipelineConfig 객체를 만들어 반환합니다.
+    이후 호출에서는 캐시된 객체를 그대로 돌려줍니다.
+    """
+    global _loaded_config
+    if _loaded_config is not None and not reload:
+        return _loaded_config
+
+    # python-dotenv는 설정이 실제로 필요할 때만 임포트합니다.
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+
+    _loaded_config = PipelineConfig(
+        training_key=os.getenv("AZURE_TRAINING_KEY"),
+        training_endpoint=os.getenv("AZURE_TRAINING_ENDPOINT"),
+        prediction_key=os.getenv("AZURE_PREDICTION_KEY"),
+        prediction_endpoint=os.getenv("AZURE_PREDICTION_ENDPOINT"),
+        prediction_resource_id=os.getenv("AZURE_PREDICTION_RESOURCE_ID"),
+        prediction_project_id=os.getenv("AZURE_PREDICTION_PROJECT_ID"),
+        uploader_project_id=os.getenv("AZURE_UPLOADER_PROJECT_ID"),
+        prediction_backend=(os.getenv("PREDICTION_BACKEND") or "remote").strip().lower(),
+        prediction_input=(os.getenv("PREDICTION_INPUT") or "url").strip().lower(),
+        prediction_concurrency=_get_int_env("PREDICTION_CONCURRENCY", 8),
+        local_inference_workers=_get_int_env("LOCAL_INFERENCE_WORKERS", 0),
+        local_inference_batch_size=_get_int_env("LOCAL_INFERENCE_BATCH_SIZE", 16),
+        upload_mode=(os.getenv("UPLOAD_MODE") or "url").strip().lower(),
+        storage_keep_recent_runs=_get_int_env("STORAGE_KEEP_RECENT_RUNS", 3),
+        storage_max_age_days=_get_int_env("STORAGE_MAX_AGE_DAYS", 90),
+        storage_max_disk_mb=_get_int_env("STORAGE_MAX_DISK_MB", 0),
+        metadata_ttl_tags=_get_int_env("METADATA_TTL_TAGS", 24 * 3600),
+        metadata_ttl_iterations=_get_int_env("METADATA_TTL_ITERATIONS", 3600),
+        selection_budget=_get_int_env("SELECTION_BUDGET", 0),
+        train_min_new_images=_get_int_env("TRAIN_MIN_NEW_IMAGES", 20),
+        train_min_new_regions=_get_int_env("TRAIN_MIN_NEW_REGIONS", 50),
+        train_max_days_since_train=_get_int_env("TRAIN_MAX_DAYS_SINCE_TRAIN", 7),
+        train_advanced_growth_ratio=_get_float_env("TRAIN_ADVANCED_GROWTH_RATIO", 0.3),
+        train_advanced_budget_hours=_get_int_env("TRAIN_ADVANCED_BUDGET_HOURS", 1),
+        iteration_retention=_get_int_env("ITERATION_RETENTION", 5),
+        profile_regression_threshold=_get_float_env("PROFILE_REGRESSION_THRESHOLD", 0.5),
+    )
+    return _loaded_config
@@ -12,6 +12,8 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
+import storage
+
 
 # --- 여기가 요청에 따라 수정되었습니다 ---
 def sanitize_filename(filename):
@@ -129,7 +131,8 @@ def crawl_youtube_trending():
 
                 if download_and_verify_image(thumbnail_url, image_path, title):
                     video_data.append({
-                        "rank": i + 1, "title": title, "link": link, "thumbnail_file": image_filename
+                        "rank": i + 1, "title": title, "link": link, "thumbnail_file": image_filename,
+                        "thumbnail_url": thumbnail_url
                     })
             except Exception as e:
                 print(f"  - 동영상 정보 처리 중 예상치 못한 오류: {e}")
@@ -140,6 +143,7 @@ def crawl_youtube_trending():
             csv_path = os.path.join(base_folder, f"youtube_trending_rankings_{timestamp_str}.csv")
             df.to_csv(csv_path, index=False, encoding="utf-8-sig")
             print(f"\n데이터 저장 완료: {csv_path} ({len(video_data)}개 수집)")
+            storage.mark_latest(base_folder)
             return image_folder
         else:
             print("\n수집된 유효한 데이터가 없습니다.")
@@ -155,7 +159,11 @@ def crawl_youtube_trending():
 
 if __name__ == "__main__":
     print("--- 크롤러 모듈 단독 테스트 실행 ---")
-    result_folder = crawl_youtube_trending()
+    import profiling
+    with profiling.profiler_from_argv().profile_stage("crawl") as stage:
+        result_folder = crawl_youtube_trending()
+        if result_folder:
+            stage.run_folder = os.path.dirname(result_folder)
     if result_folder:
         print(f"\n[테스트 성공] 썸네일이 저장된 최종 경로: {result_folder}")
     else:
@@ -0,0 +1,244 @@
+# distributed.py
+
+import multiprocessing
+import os
+import socket
+import threading
+import time
+
+import config
+import json_store
+import storage
+from work_queue import WorkQueue, DEFAULT_QUEUE_PATH
+
+# 코디네이터/워커 모드
+# - 코디네이터(run_distributed)는 실행 폴더의 이미지마다 예측 작업을, 예측 결과로 만든 업로드 계획의
+#   이미지마다 업로드 작업을 큐에 넣고, 워커가 모두 처리할 때까지 기다린 뒤 결과를 모읍니다.
+# - 워커(run_worker)는 같은 큐 파일을 보는 어느 프로세스/호스트에서든 실행할 수 있으며,
+#   프로세스 수를 늘리면 처리량이 함께 늘어납니다.
+# 작업은 최소 한 번 실행되므로, 예측은 부수 효과가 없고 업로드는 OKDuplicate로 중복이 무시됩니다.
+# 예측 작업은 실행 이름과 게시된 Iteration ID로 묶으므로, 새 모델이 게시되면 예전 예측을 재사용하지 않습니다.
+
+PREDICT = "predict"
+UPLOAD = "upload"
+POLL_INTERVAL_SECONDS = 1.0
+
+
+def _task_key(job, kind, file_name):
+    return f"{job}:{kind}:{file_name}"
+
+
+# --- 워커 ---
+def _handle_predict(payload):
+    import azure_predictor
+    run_data = storage.open_run(payload["image_folder"])
+    return azure_predictor.predict_one_image(run_data, payload["file_name"], payload.get("image_url"),
+                                             payload["url_prediction_url"], payload["prediction_url"])
+
+
+def _handle_upload(payload):
+    import azure_uploader
+    return azure_uploader.upload_single_image(payload["image_folder"], payload["file_name"],
+                                              payload["regions"], payload.get("image_url"))
+
+
+HANDLERS = {PREDICT: _handle_predict, UPLOAD: _handle_upload}
+
+
+def _start_heartbeat(queue, task, worker_id):
+    """작업을 처리하는 동안 임대 시간의 1/3마다 임대를 연장하는 스레드를 시작하고, 중지용 Event를 반환합니다."""
+    stop = threading.Event()
+
+    def beat():
+        while not stop.wait(queue.lease_seconds / 3):
+            if not queue.heartbeat(task["id"], worker_id):
+                print(f"  - ⚠️ 작업 임대를 잃었습니다: {task['task_key']}")
+                return
+
+    threading.Thread(target=beat, name=f"heartbeat-{task['id']}", daemon=True).start()
+    return stop
+
+
+def run_worker(queue_path=DEFAULT_QUEUE_PATH, worker_id=None, kinds=None, idle_exit=None,
+               poll_interval=POLL_INTERVAL_SECONDS):
+    """
+    큐에서 작업을 임대해 처리하는 워커 루프입니다.
+    idle_exit(초)가 주어지면 그 시간 동안 작업이 없을 때 종료하고, 없으면 계속 대기합니다.
+    반환값: 처리한 작업 수
+    """
+    import azure_predictor
+    import azure_uploader
+
+    pipeline_config = config.load_config()
+    azure_predictor.configure(pipeline_config)
+    azure_uploader.configure(pipeline_config)
+
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    queue = WorkQueue(queue_path)
+    print(f"👷 워커 시작: {worker_id} (큐: {queue_path}, 작업 종류: {', '.join(kinds or HANDLERS)})")
+
+    processed, idle_since = 0, time.time()
+    while True:
+        task = queue.lease(worker_id, kinds or list(HANDLERS))
+        if task is None:
+            if idle_exit is not None and time.time() - idle_since >= idle_exit:
+                break
+            time.sleep(poll_interval)
+            continue
+
+        stop_heartbeat = _start_heartbeat(queue, task, worker_id)
+        try:
+            result = HANDLERS[task["kind"]](task["payload"])
+        except Exception as e:
+            queue.fail(task["id"], worker_id, e)
+            print(f"  - ❌ 작업 실패 ({task['attempts']}/{task['max_attempts']}회): {task['task_key']}, 오류: {e}")
+        else:
+            queue.complete(task["id"], worker_id, result)
+        finally:
+            stop_heartbeat.set()
+        processed += 1
+        idle_since = time.time()
+
+    print(f"👷 워커 종료: {worker_id} (처리한 작업 {processed}개)")
+    return processed
+
+
+def start_local_workers(count, queue_path=DEFAULT_QUEUE_PATH, kinds=None, idle_exit=None):
+    """워커 프로세스를 count개 띄우고 Process 목록을 반환합니다."""
+    workers = []
+    for _ in range(count):
+        process = multiprocessing.Process(target=run_worker, args=(queue_path, None, kinds, idle_exit))
+        process.start()
+        workers.append(process)
+    return workers
+
+
+# --- 코디네이터 ---
+def _wait_for_tasks(queue, job, kind, timeout=None):
+    """해당 종류의 작업이 모두 완료/실패할 때까지 진행 상황을 출력하며 기다립니다. 시간 초과 시 False를 반환합니다."""
+    start_time, last_report = time.time(), None
+    while True:
+        counts = queue.counts(job, kind)
+        remaining = counts.get("pending", 0) + counts.get("leased", 0)
+        report = (counts.get("done", 0), counts.get("failed", 0), remaining)
+        if report != last_report:
+            print(f"  - ⏳ {kind} 작업: 완료 {report[0]}개, 실패 {report[1]}개, 남은 작업 {report[2]}개")
+            last_report = report
+        if remaining == 0:
+            return True
+        if timeout is not None and time.time() - start_time > timeout:
+            print(f"❌ {kind} 작업 대기 시간 초과 (남은 작업 {remaining}개)")
+            return False
+        time.sleep(POLL_INTERVAL_SECONDS)
+
+
+def _enqueue_predictions(queue, job, image_folder, prediction_url, url_prediction_url, use_urls=True):
+    """이미지마다 예측 작업을 넣습니다. use_urls가 False이면(PREDICTION_INPUT=file) 워커가 이미지 바이트로 예측합니다."""
+    import azure_predictor
+
+    thumbnail_urls = azure_predictor.load_thumbnail_urls(image_folder) if use_urls else {}
+    image_files = azure_predictor.list_image_files(image_folder)
+    added = 0
+    for file_name in image_files:
+        payload = {"image_folder": image_folder, "file_name": file_name,
+                   "image_url": thumbnail_urls.get(file_name),
+                   "prediction_url": prediction_url, "url_prediction_url": url_prediction_url}
+        added += queue.enqueue(job, PREDICT, _task_key(job, PREDICT, file_name), payload)
+    print(f"📥 예측 작업 {added}개를 큐에 추가했습니다. (이미지 {len(image_files)}개, 완료된 작업은 재사용, 실패한 작업은 재시도)")
+
+
+def _collect_predictions(queue, job):
+    """큐의 예측 결과를 convert_to_coco()가 받는 {파일 이름: 예측 결과 또는 예외} 형태로 모읍니다."""
+    results = {}
+    for payload, result, error, status in queue.results(job, PREDICT):
+        results[payload["file_name"]] = result if status == "done" else RuntimeError(error)
+    return results
+
+
+def _enqueue_uploads(queue, job, image_folder, uploads, image_urls):
+    added = 0
+    for file_name, regions in uploads.items():
+        payload = {"image_folder": image_folder, "file_name": file_name, "regions": regions,
+                   "image_url": (image_urls or {}).get(file_name)}
+        added += queue.enqueue(job, UPLOAD, _task_key(job, UPLOAD, file_name), payload)
+    print(f"📥 업로드 작업 {added}개를 큐에 추가했습니다.")
+
+
+def run_distributed(run_folder, pipeline_config=None, queue_path=DEFAULT_QUEUE_PATH, local_workers=4,
+                    timeout=None):
+    """
+    실행 폴더 하나의 예측과 업로드를 워커들에게 나누어 맡기고, 결과를 모아 학습 정책까지 적용합니다.
+    local_workers가 0이면 다른 호스트/프로세스에서 `python main.py worker`로 띄운 워커만 사용합니다.
+    PREDICTION_BACKEND=local이면 예측은 코디네이터가 로컬 추론으로 처리하고(실패 시 워커에 분배) 업로드만 분배합니다.
+    """
+    import azure_predictor
+    import azure_uploader
+
+    pipeline_config = pipeline_config or config.load_config()
+    missing = pipeline_config.missing_predictor_settings() + pipeline_config.missing_uploader_settings()
+    if missing:
+        print(f"❌ .env 파일에 Azure 설정값이 모두 지정되지 않았습니다. (누락: {', '.join(sorted(set(missing)))})")
+        return False
+    azure_predictor.configure(pipeline_config)
+    azure_uploader.configure(pipeline_config)
+
+    image_folder = os.path.join(run_folder, storage.IMAGE_FOLDER)
+    output_coco_path = os.path.join(run_folder, "predictions.json")
+    job = os.path.basename(os.path.normpath(run_folder))
+    queue = WorkQueue(queue_path)
+
+    if not azure_predictor.validate_azure_tags(azure_predictor.PROJECT_ID, azure_predictor.LABEL_INFO):
+        print("\n❌ 태그 설정 불일치로 인해 분산 실행을 중단합니다.")
+        return False
+    latest_iteration = azure_predictor.get_latest_published_iteration(azure_predictor.PROJECT_ID)
+    if not latest_iteration:
+        return False
+    prediction_url = azure_predictor.build_prediction_url(azure_predictor.PROJECT_ID, latest_iteration)
+    url_prediction_url = azure_predictor.build_url_prediction_url(azure_predictor.PROJECT_ID, latest_iteration)
+
+    print(f"\n▶️ 분산 실행 시작 (작업: {job}, 큐: {queue_path}, 로컬 워커: {local_workers}개)")
+    if not local_workers:
+        print("   다른 프로세스/호스트에서 `python main.py worker`로 워커를 실행해야 작업이 처리됩니다.")
+    # 예측 작업 키에 Iteration ID를 넣어, 다른 모델로 만든 예측 결과를 재사용하지 않게 합니다.
+    predict_job = f"{job}@{latest_iteration['id']}"
+    workers = start_local_workers(local_workers, queue_path)
+    try:
+        # 1. 이미지별 예측
+        predictions = None
+        if pipeline_config.prediction_backend == "local":
+            predictions = azure_predictor.run_local_inference(image_folder, latest_iteration, pipeline_config)
+        if predictions is None:
+            _enqueue_predictions(queue, predict_job, image_folder, prediction_url, url_prediction_url,
+                                 use_urls=pipeline_config.prediction_input == "url")
+            if not _wait_for_tasks(queue, predict_job, PREDICT, timeout):
+                return False
+            predictions = _collect_predictions(queue, predict_job)
+        coco_data = azure_predictor.convert_to_coco(image_folder, prediction_url, azure_predictor.LABEL_INFO,
+                                                    predictions)
+        # 압축된 실행은 실행 폴더가 없을 수 있으므로 폴더를 만들며 원자적으로 저장합니다.
+        json_store.write_json_atomic(output_coco_path, coco_data)
+        print(f"\n✅ 예측 완료. 결과 저장: {output_coco_path}")
+
+        # 2. 이미지별 업로드
+        plan = azure_uploader.prepare_upload_plan(image_folder, output_coco_path, pipeline_config)
+        if plan is None:
+            return False
+        _enqueue_uploads(queue, job, image_folder, plan["uploads"], plan["image_urls"])
+        if not _wait_for_tasks(queue, job, UPLOAD, timeout):
+            return False
+    finally:
+        # 로컬 워커는 이 작업만을 위해 띄웠으므로 여기서 정리합니다. (남은 작업은 임대 만료 후 재실행됩니다.)
+        for process in workers:
+            process.terminate()
+        for process in workers:
+            process.join()
+
+    # 3. 이번에 새로 추가된(OK) 이미지만 학습 정책에 반영합니다. (중복/실패 제외)
+    results = [(payload, result, status) for payload, result, _, status in queue.results(job, UPLOAD)
+               if payload["file_name"] in plan["uploads"]]
+    added = [payload for payload, result, status in results if status == "done" and result.get("status") == "OK"]
+    failed = sum(1 for _, _, status in results if status == "failed")
+    print(f"📊 업로드 결과: 신규 {len(added)}개, 중복 {len(results) - len(added) - failed}개, 실패 {failed}개")
+    uploaded_regions = sum(len(payload["regions"]) for payload in added)
+    azure_uploader.maybe_train(plan["policy"], plan["project_images"], len(added), uploaded_regions)
+    return True
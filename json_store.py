@@ -0,0 +1,75 @@
+# json_store.py
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def read_json(path, default):
+    """JSON 파일을 읽습니다. 파일이 없거나 깨져 있으면 default를 반환합니다."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def write_json_atomic(path, data, indent=2):
+    """임시 파일에 쓴 뒤 교체하여, 읽는 쪽이 반쯤 쓰인 파일을 보지 않도록 합니다."""
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    # 프로세스/스레드마다 다른 임시 파일을 써서 동시에 쓰는 쪽끼리 임시 파일을 덮어쓰지 않게 합니다.
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=indent, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+@contextmanager
+def file_lock(path):
+    """
+    path 옆의 '<path>.lock' 파일로 프로세스 간 배타 잠금을 겁니다. (같은 프로세스의 다른 스레드 사이에도 유효)
+    POSIX에서는 flock, Windows에서는 msvcrt.locking을 사용합니다.
+    """
+    lock_path = f"{path}.lock"
+    if os.path.dirname(lock_path):
+        os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+    with open(lock_path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    # LK_LOCK은 약 10초 동안 재시도한 뒤 실패하므로, 잠금을 얻을 때까지 반복합니다.
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def locked_json(path, default, indent=2):
+    """
+    잠금을 건 채로 JSON 파일을 읽어 그 객체를 돌려주고, 블록이 정상 종료되면 수정된 객체를 저장합니다.
+    여러 프로세스가 같은 파일을 읽고-수정하고-쓰더라도 서로의 변경을 잃지 않습니다.
+    """
+    with file_lock(path):
+        data = read_json(path, default)
+        yield data
+        write_json_atomic(path, data, indent)
@@ -0,0 +1,224 @@
+# local_inference.py
+
+import io
+import os
+import shutil
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+import requests
+
+# 내보낸 모델을 Iteration별로 캐시하는 폴더 (models/<프로젝트 ID>/<Iteration ID>/)
+MODEL_CACHE_DIR = "models"
+MODEL_FILE = "model.onnx"
+LABELS_FILE = "labels.txt"
+EXPORT_PLATFORM = "ONNX"
+
+# 객체 탐지 내보내기 모델의 출력(detected_boxes/classes/scores)을 이름의 이 부분으로 찾습니다.
+OUTPUT_KINDS = ("boxes", "classes", "scores")
+# 모델 메타데이터(Image.BitmapPixelFormat)별 채널 순서. 메타데이터가 없으면 내보내기 샘플과 같은 BGR로 봅니다.
+PIXEL_FORMATS = {"Bgr8": (2, 1, 0), "Rgb8": (0, 1, 2)}
+# 모델 메타데이터(Image.NominalPixelRange)별 (배율, 오프셋). 메타데이터가 없으면 0~255 범위로 봅니다.
+PIXEL_RANGES = {
+    "NominalRange_0_255": (1.0, 0.0),
+    "Normalized_0_1": (1.0 / 255, 0.0),
+    "Normalized_1_1": (2.0 / 255, -1.0),
+}
+
+# 워커 프로세스마다 한 번만 로드되는 추론 세션, 라벨 목록, 입출력 형식
+_session = None
+_labels = None
+_model_format = None
+
+
+def missing_runtime_packages():
+    """로컬 추론에 필요하지만 설치되지 않은 패키지 이름 목록을 반환합니다. (requirements.txt에서 선택 설치)"""
+    import importlib.util
+    return [name for name in ("onnxruntime", "numpy") if importlib.util.find_spec(name) is None]
+
+
+def _export_url(training_endpoint, project_id, iteration_id):
+    return f"{training_endpoint}customvision/v3.3/training/projects/{project_id}/iterations/{iteration_id}/export"
+
+
+def export_iteration_model(training_endpoint, training_key, project_id, iteration_id, timeout=600, interval=10):
+    """
+    Iteration을 ONNX로 내보내고 다운로드 URL을 반환합니다.
+    이미 완료된 내보내기가 있으면 재사용합니다. (Compact 도메인 프로젝트만 내보낼 수 있습니다.)
+    """
+    url = _export_url(training_endpoint, project_id, iteration_id)
+    headers = {"Training-Key": training_key}
+
+    res = requests.get(url, headers=headers)
+    res.raise_for_status()
+    exports = [e for e in res.json() if e.get("platform") == EXPORT_PLATFORM]
+    if not exports:
+        print(f"  - 📦 Iteration을 {EXPORT_PLATFORM}로 내보내기 요청합니다...")
+        res = requests.post(f"{url}?platform={EXPORT_PLATFORM}", headers=headers)
+        res.raise_for_status()
+
+    start_time = time.time()
+    while time.time() - start_time < timeout:
+        res = requests.get(url, headers=headers)
+        res.raise_for_status()
+        for export in res.json():
+            if export.get("platform") != EXPORT_PLATFORM:
+                continue
+            if export.get("status") == "Done":
+                return export["downloadUri"]
+            if export.get("status") == "Failed":
+                raise RuntimeError("모델 내보내기가 실패했습니다.")
+        print(f"  - ⏳ 모델 내보내기 대기 중... (경과 시간: {int(time.time() - start_time)}초)")
+        time.sleep(interval)
+    raise TimeoutError("모델 내보내기 대기 시간 초과")
+
+
+def ensure_model(training_endpoint, training_key, project_id, iteration_id, cache_dir=MODEL_CACHE_DIR):
+    """Iteration의 ONNX 모델이 캐시에 없으면 내보내서 내려받고, 모델 폴더 경로를 반환합니다."""
+    model_dir = os.path.join(cache_dir, project_id, iteration_id)
+    if os.path.isfile(os.path.join(model_dir, MODEL_FILE)) and os.path.isfile(os.path.join(model_dir, LABELS_FILE)):
+        print(f"  - ✅ 캐시된 모델 사용: {model_dir}")
+        return model_dir
+
+    download_uri = export_iteration_model(training_endpoint, training_key, project_id, iteration_id)
+    print("  - ⬇️ 내보낸 모델을 다운로드합니다...")
+    res = requests.get(download_uri, timeout=300)
+    res.raise_for_status()
+
+    # 다운로드 도중 중단되어도 캐시가 깨지지 않도록 임시 폴더에 풀고 이름을 바꿉니다.
+    tmp_dir = model_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    with zipfile.ZipFile(io.BytesIO(res.content)) as archive:
+        for member in (MODEL_FILE, LABELS_FILE):
+            with archive.open(member) as src, open(os.path.join(tmp_dir, member), "wb") as dst:
+                shutil.copyfileobj(src, dst)
+    shutil.rmtree(model_dir, ignore_errors=True)
+    os.replace(tmp_dir, model_dir)
+    print(f"  - ✅ 모델 캐시 저장: {model_dir}")
+    return model_dir
+
+
+def _create_session(model_dir):
+    import onnxruntime
+
+    options = onnxruntime.SessionOptions()
+    # 프로세스 단위로 병렬화하므로 세션 내부 스레드는 1개로 제한합니다.
+    options.intra_op_num_threads = 1
+    return onnxruntime.InferenceSession(os.path.join(model_dir, MODEL_FILE), options,
+                                        providers=["CPUExecutionProvider"])
+
+
+def _model_format_of(session):
+    """
+    세션의 출력 이름과 메타데이터에서 추론에 필요한 형식을 읽습니다.
+    객체 탐지 모델이 아니거나(예: 분류 모델의 model_outputs0) 알 수 없는 입력 형식이면 ValueError를 발생시킵니다.
+    """
+    output_names = [output.name for output in session.get_outputs()]
+    matched = {kind: [name for name in output_names if kind in name.lower()] for kind in OUTPUT_KINDS}
+    missing = [kind for kind, names in matched.items() if len(names) != 1]
+    if missing:
+        raise ValueError(f"객체 탐지 모델 출력({', '.join(OUTPUT_KINDS)})을 찾을 수 없습니다. "
+                         f"(모델 출력: {', '.join(output_names)})")
+
+    metadata = session.get_modelmeta().custom_metadata_map
+    pixel_format = metadata.get("Image.BitmapPixelFormat", "Bgr8")
+    pixel_range = metadata.get("Image.NominalPixelRange", "NominalRange_0_255")
+    if pixel_format not in PIXEL_FORMATS or pixel_range not in PIXEL_RANGES:
+        raise ValueError(f"지원하지 않는 입력 형식입니다. (픽셀 형식: {pixel_format}, 범위: {pixel_range})")
+    scale, offset = PIXEL_RANGES[pixel_range]
+    return {"output_names": [matched[kind][0] for kind in OUTPUT_KINDS],
+            "channel_order": PIXEL_FORMATS[pixel_format], "scale": scale, "offset": offset}
+
+
+def inspect_model(model_dir):
+    """워커를 띄우기 전에 모델이 로컬 추론에 맞는지 확인하고 입출력 형식을 반환합니다. 맞지 않으면 ValueError를 발생시킵니다."""
+    return _model_format_of(_create_session(model_dir))
+
+
+def _init_worker(model_dir):
+    """워커 프로세스 시작 시 ONNX 세션을 한 번만 생성합니다."""
+    global _session, _labels, _model_format
+    _session = _create_session(model_dir)
+    _model_format = _model_format_of(_session)
+    with open(os.path.join(model_dir, LABELS_FILE), "r", encoding="utf-8") as f:
+        _labels = [line.strip() for line in f if line.strip()]
+
+
+def _preprocess(image_path, input_width, input_height):
+    """모델 메타데이터의 채널 순서와 픽셀 범위에 맞춰 NCHW 텐서로 변환합니다."""
+    import numpy as np
+    from PIL import Image
+
+    with Image.open(image_path) as img:
+        resized = img.convert("RGB").resize((input_width, input_height))
+        array = np.asarray(resized, dtype=np.float32)
+    array = array * _model_format["scale"] + _model_format["offset"]
+    return array[:, :, _model_format["channel_order"]].transpose((2, 0, 1))
+
+
+def _to_prediction_result(boxes, classes, scores):
+    """ONNX 출력을 원격 예측 API와 같은 형식({'predictions': [...]})으로 변환합니다."""
+    predictions = []
+    for (x1, y1, x2, y2), class_id, score in zip(boxes, classes, scores):
+        class_id = int(class_id)
+        if class_id >= len(_labels):
+            continue
+        predictions.append({
+            "tagName": _labels[class_id],
+            "probability": float(score),
+            "boundingBox": {"left": float(x1), "top": float(y1), "width": float(x2 - x1), "height": float(y2 - y1)},
+        })
+    return {"predictions": predictions}
+
+
+def _predict_batch(image_paths):
+    """워커 프로세스에서 이미지 묶음을 추론하고 [(파일 이름, 결과 또는 예외), ...]를 반환합니다."""
+    import numpy as np
+
+    model_input = _session.get_inputs()[0]
+    _, _, input_height, input_width = model_input.shape
+    output_names = _model_format["output_names"]
+    # 배치 차원이 고정(1)된 모델은 한 장씩, 가변이면 묶음 전체를 한 번에 추론합니다.
+    fixed_batch = isinstance(model_input.shape[0], int)
+
+    results, tensors, names = [], [], []
+    for image_path in image_paths:
+        try:
+            tensors.append(_preprocess(image_path, input_width, input_height))
+            names.append(os.path.basename(image_path))
+        except Exception as e:
+            results.append((os.path.basename(image_path), e))
+    if not tensors:
+        return results
+
+    try:
+        if fixed_batch:
+            outputs = [_session.run(output_names, {model_input.name: tensor[np.newaxis]}) for tensor in tensors]
+            per_image = [(boxes[0], classes[0], scores[0]) for boxes, classes, scores in outputs]
+        else:
+            boxes, classes, scores = _session.run(output_names, {model_input.name: np.stack(tensors)})
+            per_image = list(zip(boxes, classes, scores))
+        results.extend((name, _to_prediction_result(*out)) for name, out in zip(names, per_image))
+    except Exception as e:
+        results.extend((name, e) for name in names)
+    return results
+
+
+def predict_images(model_dir, image_paths, workers=0, batch_size=16):
+    """
+    프로세스 풀에서 이미지를 배치 단위로 추론합니다.
+    반환값: {파일 이름: 예측 결과 또는 예외}
+    """
+    workers = workers or os.cpu_count() or 1
+    batches = [image_paths[i:i + batch_size] for i in range(0, len(image_paths), batch_size)]
+    print(f"  - 🧮 이미지 {len(image_paths)}개를 {len(batches)}개 배치로 나누어 {workers}개 프로세스에서 추론합니다...")
+
+    start_time = time.time()
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(model_dir,)) as executor:
+        for batch_results in executor.map(_predict_batch, batches):
+            results.update(batch_results)
+    print(f"  - ✅ 로컬 추론 완료 ({time.time() - start_time:.1f}초)")
+    return results
@@ -1,29 +1,40 @@
 # main.py
 
-import schedule
-import time
-import threading
-from datetime import datetime
+import argparse
 import os
 import sys  # 커맨드 라인 인자를 읽기 위해 sys 모듈을 임포트합니다.
+from datetime import datetime
 
-# 각 모듈에서 실행 함수 임포트
-import crawler
-import azure_predictor
-import azure_uploader
+import config
+import profiling
+import storage
 
+# crawler(selenium, pandas), azure_predictor(PIL), azure_uploader, schedule 모듈은
+# 무거운 의존성을 끌고 오므로, 각 서브커맨드가 실제로 필요할 때만 함수 안에서 임포트합니다.
 
-def run_pipeline():
+
+def run_pipeline(pipeline_config=None, profiler=None):
     """
     크롤링, 예측, 업로드/학습으로 이어지는 전체 파이프라인을 실행합니다.
+    profiler가 활성화되어 있으면 각 단계의 프로파일 결과를 실행 폴더의 profile/에 저장합니다.
     """
+    import crawler
+    import azure_predictor
+    import azure_uploader
+
+    pipeline_config = pipeline_config or config.load_config()
+    profiler = profiler or profiling.Profiler()
+
     print(f"\n{'=' * 50}")
     print(f"🚀 파이프라인 시작: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"{'=' * 50}")
 
     # 1. 크롤링 수행
     print("\n[1/3] 유튜브 썸네일 크롤링 시작...")
-    image_folder = crawler.crawl_youtube_trending()
+    with profiler.profile_stage("crawl") as stage:
+        image_folder = crawler.crawl_youtube_trending()
+        if image_folder:
+            stage.run_folder = os.path.dirname(image_folder)
 
     if not image_folder:
         print("❌ 크롤링 실패. 파이프라인을 중단합니다.")
@@ -40,7 +51,8 @@ def run_pipeline():
         os.remove(prediction_output_path)
 
     print("\n[2/3] Azure 객체 탐지 예측 시작...")
-    prediction_success = azure_predictor.run_prediction(image_folder, prediction_output_path)
+    with profiler.profile_stage("predict", base_data_folder):
+        prediction_success = azure_predictor.run_prediction(image_folder, prediction_output_path, pipeline_config)
 
     if not prediction_success:
         print("❌ 예측 실패. 파이프라인을 중단합니다.")
@@ -49,13 +61,18 @@ def run_pipeline():
 
     # 3. 업로드 및 학습 수행
     print("\n[3/3] Azure 업로드 및 학습 시작...")
-    uploader_success = azure_uploader.run_uploader(image_folder, prediction_output_path)
+    with profiler.profile_stage("upload", base_data_folder):
+        uploader_success = azure_uploader.run_uploader(image_folder, prediction_output_path, pipeline_config)
 
     if not uploader_success:
         print("❌ 업로드 및 학습 실패.")
     else:
         print("✅ 업로드 및 학습 성공.")
 
+    # 4. 오래된 실행 데이터 압축 및 보존 정책 적용
+    with profiler.profile_stage("storage", base_data_folder):
+        storage.run_maintenance(pipeline_config)
+
     print(f"\n{'=' * 50}")
     print(f"🎉 파이프라인 종료: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"{'=' * 50}")
@@ -63,27 +80,240 @@ def run_pipeline():
 
 def run_threaded(job_func):
     """스레드를 사용하여 작업을 실행합니다. (긴 작업이 스케줄러를 막지 않도록 함)[2]"""
+    import threading
     job_thread = threading.Thread(target=job_func)
     job_thread.start()
 
 
-# --- 이 아래 부분이 요청에 따라 수정되었습니다 ---
-if __name__ == "__main__":
+def _resolve_run_folder(folder):
+    """--folder 인자가 없으면 가장 최근 크롤링 실행 폴더를 사용합니다."""
+    run_folder = folder or storage.find_latest_run_folder()
+    if not run_folder:
+        print("❌ 크롤링 데이터 폴더를 찾을 수 없습니다. 먼저 `python main.py crawl`을 실행하여 데이터를 수집해주세요.")
+        return None
+    # thumbnails 폴더를 직접 지정한 경우 상위 실행 폴더로 맞춥니다.
+    if os.path.basename(os.path.normpath(run_folder)) == "thumbnails":
+        run_folder = os.path.dirname(os.path.normpath(run_folder))
+    return run_folder
+
+
+def _make_profiler(args):
+    """--profile/--update-baseline 인자로 Profiler를 만듭니다. (프로파일을 켜지 않으면 설정을 읽지 않습니다)"""
+    if not args.profile:
+        return profiling.Profiler()
+    return profiling.Profiler.from_config(config.load_config(), enabled=True, update_baseline=args.update_baseline)
+
+
+# --- 서브커맨드 ---
+def cmd_crawl(args):
+    import crawler
+    with _make_profiler(args).profile_stage("crawl") as stage:
+        image_folder = crawler.crawl_youtube_trending()
+        if image_folder:
+            stage.run_folder = os.path.dirname(image_folder)
+    return image_folder is not None
+
+
+def cmd_predict(args):
+    run_folder = _resolve_run_folder(args.folder)
+    if not run_folder:
+        return False
+    image_folder = os.path.join(run_folder, "thumbnails")
+    output_path = os.path.join(run_folder, "predictions.json")
+    try:
+        storage.open_run(run_folder)
+    except FileNotFoundError:
+        print(f"❌ 오류: 이미지 폴더 '{image_folder}'를 찾을 수 없습니다.")
+        return False
+    if os.path.exists(output_path):
+        print(f"🗑️ 기존 '{output_path}' 파일을 삭제합니다.")
+        os.remove(output_path)
+
+    import azure_predictor
+    with _make_profiler(args).profile_stage("predict", run_folder):
+        return azure_predictor.run_prediction(image_folder, output_path, config.load_config())
+
+
+def cmd_upload(args):
+    run_folder = _resolve_run_folder(args.folder)
+    if not run_folder:
+        return False
+    image_folder = os.path.join(run_folder, "thumbnails")
+    json_file_path = os.path.join(run_folder, "predictions.json")
+    try:
+        has_predictions = storage.open_run(run_folder).has_file("predictions.json")
+    except FileNotFoundError:
+        has_predictions = False
+    if not has_predictions:
+        print(f"❌ 오류: '{json_file_path}' 파일을 찾을 수 없습니다. 먼저 `python main.py predict`를 실행해주세요.")
+        return False
+
+    import azure_uploader
+    with _make_profiler(args).profile_stage("upload", run_folder):
+        return azure_uploader.run_uploader(image_folder, json_file_path, config.load_config())
+
+
+def cmd_train(args):
+    import azure_uploader
+    with _make_profiler(args).profile_stage("train"):
+        return azure_uploader.run_training(config.load_config(), force=args.force)
+
+
+def cmd_run(args):
+    run_pipeline(config.load_config(), _make_profiler(args))
+    return True
+
+
+def cmd_status(args):
+    """네트워크 호출 없이 설정과 최근 실행 폴더 상태만 출력합니다."""
+    pipeline_config = config.load_config()
+    print("📋 파이프라인 상태")
+    missing_predictor = pipeline_config.missing_predictor_settings()
+    missing_uploader = pipeline_config.missing_uploader_settings()
+    print(f"  - 예측기 설정: {'✅ 완료' if not missing_predictor else '❌ 누락 ' + ', '.join(missing_predictor)}")
+    print(f"  - 업로더 설정: {'✅ 완료' if not missing_uploader else '❌ 누락 ' + ', '.join(missing_uploader)}")
+
+    archive_index = storage.load_archive_index()
+    archive_mb = sum(entry["bytes"] for entry in archive_index.values()) / (1024 * 1024)
+    print(f"  - 압축된 실행: {len(archive_index)}개 ({archive_mb:.1f}MB)")
+
+    run_folder = storage.find_latest_run_folder()
+    if not run_folder:
+        print("  - 최근 실행 폴더: 없음")
+        return True
+    image_folder = os.path.join(run_folder, "thumbnails")
+    image_count = len(os.listdir(image_folder)) if os.path.isdir(image_folder) else 0
+    has_predictions = os.path.isfile(os.path.join(run_folder, "predictions.json"))
+    print(f"  - 최근 실행 폴더: {run_folder}")
+    print(f"  - 썸네일 수: {image_count}개")
+    print(f"  - 예측 결과(predictions.json): {'있음' if has_predictions else '없음'}")
+    return True
+
 
-    # 커맨드 라인에 '--now' 인자가 있는지 확인
-    if len(sys.argv) > 1 and sys.argv[1] == '--now':
-        # 즉시 실행 모드
+def cmd_distribute(args):
+    """실행 폴더의 예측/업로드 작업을 큐에 넣고 워커들이 처리한 결과를 모읍니다."""
+    run_folder = _resolve_run_folder(args.folder)
+    if not run_folder:
+        return False
+    try:
+        storage.open_run(run_folder)
+    except FileNotFoundError:
+        print(f"❌ 오류: 실행 폴더 '{run_folder}'를 찾을 수 없습니다.")
+        return False
+
+    import distributed
+    with _make_profiler(args).profile_stage("distribute", run_folder):
+        return distributed.run_distributed(run_folder, config.load_config(), args.queue, args.workers, args.timeout)
+
+
+def cmd_worker(args):
+    """큐의 작업을 처리하는 워커 프로세스를 실행합니다. (다른 호스트에서도 같은 큐 파일을 공유하면 참여할 수 있습니다)"""
+    import distributed
+    if args.processes <= 1:
+        distributed.run_worker(args.queue, kinds=args.kinds, idle_exit=args.idle_exit)
+        return True
+    workers = distributed.start_local_workers(args.processes, args.queue, args.kinds, args.idle_exit)
+    for process in workers:
+        process.join()
+    return all(process.exitcode == 0 for process in workers)
+
+
+def cmd_storage(args):
+    """오래된 실행 폴더를 압축하고 보존 정책(기간/용량)을 적용합니다."""
+    storage.run_maintenance(config.load_config())
+    return True
+
+
+def cmd_schedule(args):
+    import time
+    import schedule
+
+    # 스케줄 모드 (기본)
+    print(f"🗓️ 스케줄 모드로 시작합니다. 매일 {args.at}에 작업이 자동으로 실행됩니다.")
+    print("   지금 바로 1회 실행하려면 'python main.py run' 명령어를 사용하세요.")
+
+    # 매일 지정된 시각에 파이프라인 실행 예약
+    profiler = _make_profiler(args)
+    schedule.every().day.at(args.at).do(run_threaded, lambda: run_pipeline(profiler=profiler))
+
+    # 스케줄러 루프 실행
+    while True:
+        schedule.run_pending()
+        time.sleep(1)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="main.py",
+        description="유튜브 썸네일 수집 → Azure Custom Vision 예측 → 업로드/학습 파이프라인")
+    subparsers = parser.add_subparsers(dest="command")
+
+    # 단계를 실행하는 서브커맨드에 공통으로 붙는 프로파일링 옵션
+    profile_options = argparse.ArgumentParser(add_help=False)
+    profile_options.add_argument("--profile", action="store_true",
+                                 help="단계별 CPU 프로파일(cProfile)과 메모리(tracemalloc)를 실행 폴더의 profile/에 저장합니다.")
+    profile_options.add_argument("--update-baseline", action="store_true",
+                                 help="이번 프로파일 결과를 성능 회귀 판정 기준값으로 저장합니다. (--profile과 함께 사용)")
+
+    subparsers.add_parser("crawl", help="유튜브 인기 급상승 썸네일만 수집합니다.",
+                          parents=[profile_options]).set_defaults(func=cmd_crawl)
+
+    predict_parser = subparsers.add_parser("predict", help="실행 폴더의 썸네일을 프로젝트 A로 예측합니다.",
+                                           parents=[profile_options])
+    predict_parser.add_argument("--folder", help="대상 실행 폴더 (기본값: 가장 최근 폴더)")
+    predict_parser.set_defaults(func=cmd_predict)
+
+    upload_parser = subparsers.add_parser("upload", help="예측 결과를 프로젝트 B에 업로드하고 학습합니다.",
+                                          parents=[profile_options])
+    upload_parser.add_argument("--folder", help="대상 실행 폴더 (기본값: 가장 최근 폴더)")
+    upload_parser.set_defaults(func=cmd_upload)
+
+    train_parser = subparsers.add_parser("train", help="업로드 없이 학습 정책에 따라 프로젝트 B를 학습하고 게시합니다.",
+                                         parents=[profile_options])
+    train_parser.add_argument("--force", action="store_true", help="학습 정책 기준에 미달해도 일반 학습을 진행합니다.")
+    train_parser.set_defaults(func=cmd_train)
+    subparsers.add_parser("run", help="전체 파이프라인을 지금 1회 실행합니다.",
+                          parents=[profile_options]).set_defaults(func=cmd_run)
+    subparsers.add_parser("status", help="설정과 최근 실행 폴더 상태를 출력합니다.").set_defaults(func=cmd_status)
+    subparsers.add_parser("storage", help="오래된 실행 폴더를 압축하고 보존 정책을 적용합니다.").set_defaults(
+        func=cmd_storage)
+
+    distribute_parser = subparsers.add_parser("distribute", help="예측/업로드를 작업 큐에 넣고 워커들에게 분산합니다.",
+                                              parents=[profile_options])
+    distribute_parser.add_argument("--folder", help="대상 실행 폴더 (기본값: 가장 최근 폴더)")
+    distribute_parser.add_argument("--workers", type=int, default=4,
+                                   help="함께 띄울 로컬 워커 프로세스 수 (0이면 외부 워커만 사용, 기본값: 4)")
+    distribute_parser.add_argument("--queue", default=config.WORK_QUEUE_PATH, help=f"작업 큐 파일 (기본값: {config.WORK_QUEUE_PATH})")
+    distribute_parser.add_argument("--timeout", type=float, help="단계별 최대 대기 시간(초)")
+    distribute_parser.set_defaults(func=cmd_distribute)
+
+    worker_parser = subparsers.add_parser("worker", help="작업 큐의 예측/업로드 작업을 처리하는 워커를 실행합니다.")
+    worker_parser.add_argument("--processes", type=int, default=1, help="워커 프로세스 수 (기본값: 1)")
+    worker_parser.add_argument("--queue", default=config.WORK_QUEUE_PATH, help=f"작업 큐 파일 (기본값: {config.WORK_QUEUE_PATH})")
+    worker_parser.add_argument("--kinds", nargs="+", choices=["predict", "upload"], help="처리할 작업 종류 (기본값: 모두)")
+    worker_parser.add_argument("--idle-exit", type=float, help="이 시간(초) 동안 작업이 없으면 종료 (기본값: 계속 대기)")
+    worker_parser.set_defaults(func=cmd_worker)
+
+    schedule_parser = subparsers.add_parser("schedule", help="매일 지정된 시각에 파이프라인을 실행합니다.",
+                                            parents=[profile_options])
+    schedule_parser.add_argument("--at", default="03:00", help="실행 시각 (HH:MM, 기본값: 03:00)")
+    schedule_parser.set_defaults(func=cmd_schedule)
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+
+    # 기존 사용법 호환: 'python main.py --now'는 run, 인자가 없으면 schedule 모드
+    if argv[:1] == ["--now"]:
         print("▶️ 즉시 실행 모드로 파이프라인을 1회 실행합니다.")
-        run_pipeline()  # 즉시 실행 시에는 스레드 없이 바로 실행하여 로그를 순서대로 확인
-    else:
-        # 스케줄 모드 (기본)
-        print("🗓️ 스케줄 모드로 시작합니다. 매일 03:00에 작업이 자동으로 실행됩니다.")
-        print("   지금 바로 1회 실행하려면 'python main.py --now' 명령어를 사용하세요.")
+        argv = ["run"] + argv[1:]
+    elif not argv:
+        argv = ["schedule"]
+
+    args = build_parser().parse_args(argv)
+    return 0 if args.func(args) else 1
 
-        # 매일 새벽 3시에 파이프라인 실행 예약
-        schedule.every().day.at("03:00").do(run_threaded, run_pipeline)
 
-        # 스케줄러 루프 실행
-        while True:
-            schedule.run_pending()
-            time.sleep(1)
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+# metadata_cache.py
+
+import os
+import threading
+import time
+
+import json_store
+
+# 태그/Iteration 목록 같은 Azure 메타데이터를 실행 간에도 재사용하기 위한 디스크 캐시
+CACHE_PATH = os.path.join(".cache", "metadata.json")
+
+# 키 종류(키의 ':' 앞부분)별 유효 시간(초). configure()로 덮어쓸 수 있습니다.
+TTL_SECONDS = {
+    "tags": 24 * 3600,
+    "iterations": 3600,
+}
+# 유효 시간이 지난 값도 (유효 시간 × 이 배수)까지는 즉시 반환하고 백그라운드에서 갱신합니다.
+# 그보다 오래된 값은 게시 취소된 Iteration이나 삭제된 태그를 가리킬 수 있으므로 동기적으로 다시 조회합니다.
+STALE_TTL_MULTIPLIER = 2
+# 캐시를 채우는 조회 요청의 타임아웃(초). 백그라운드 갱신 스레드가 응답을 기다리며 프로세스 종료를 막지 않도록 합니다.
+FETCH_TIMEOUT_SECONDS = 30
+
+# 같은 프로세스 안에서 같은 키를 중복으로 백그라운드 갱신하지 않기 위한 잠금과 목록
+_lock = threading.Lock()
+_refreshing = set()
+
+
+def configure(pipeline_config):
+    """PipelineConfig의 TTL 설정을 적용합니다."""
+    TTL_SECONDS["tags"] = pipeline_config.metadata_ttl_tags
+    TTL_SECONDS["iterations"] = pipeline_config.metadata_ttl_iterations
+
+
+def tags_key(project_id):
+    return f"tags:{project_id}"
+
+
+def iterations_key(project_id):
+    return f"iterations:{project_id}"
+
+
+def _load():
+    return json_store.read_json(CACHE_PATH, {})
+
+
+def _ttl_for(key):
+    return TTL_SECONDS.get(key.split(":", 1)[0], 0)
+
+
+def put(key, value, started_at=None):
+    """
+    fetch()로 가져온 값을 저장합니다. started_at은 fetch()를 시작한 시각이며,
+    그 이후에 (다른 프로세스에서라도) 무효화되었거나 더 새로운 값이 저장되었다면 이 값은 버립니다.
+    """
+    started_at = time.time() if started_at is None else started_at
+    with json_store.locked_json(CACHE_PATH, {}, indent=None) as entries:
+        entry = entries.get(key, {})
+        if started_at < entry.get("invalidated_at", 0) or started_at < entry.get("fetched_at", 0):
+            return
+        entries[key] = {"value": value, "fetched_at": started_at}
+        if "invalidated_at" in entry:
+            entries[key]["invalidated_at"] = entry["invalidated_at"]
+
+
+def invalidate(*keys):
+    """우리 쪽 변경(태그 생성, 학습, 게시 등) 직후 호출하여 해당 키의 캐시를 버립니다."""
+    now = time.time()
+    with json_store.locked_json(CACHE_PATH, {}, indent=None) as entries:
+        for key in keys:
+            # 값은 버리되 무효화 시각을 남겨, 그 전에 시작된 갱신 결과가 나중에 저장되지 않도록 합니다.
+            entries[key] = {"invalidated_at": now}
+
+
+def _refresh_in_background(key, fetch):
+    with _lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+
+    def worker():
+        started_at = time.time()
+        try:
+            put(key, fetch(), started_at)
+        except Exception as e:
+            print(f"  - ⚠️ 메타데이터 캐시 백그라운드 갱신 실패 ({key}): {e}")
+        finally:
+            with _lock:
+                _refreshing.discard(key)
+
+    # 데몬 스레드가 아니므로 프로세스 종료 전에 갱신 결과가 디스크에 기록됩니다.
+    threading.Thread(target=worker, name=f"metadata-refresh-{key}").start()
+
+
+def get_or_fetch(key, fetch):
+    """
+    캐시된 값이 유효하면 네트워크 호출 없이 반환합니다.
+    유효 시간이 지났지만 유효 시간의 STALE_TTL_MULTIPLIER배 이내라면 기존 값을 반환하고 백그라운드에서 갱신하며,
+    그보다 오래되었거나 값이 없으면 fetch()를 호출해 저장한 뒤 반환합니다. fetch()의 예외는 그대로 전달됩니다.
+    """
+    entry = _load().get(key)
+    if entry is not None and "value" in entry:
+        age, ttl = time.time() - entry.get("fetched_at", 0), _ttl_for(key)
+        if age < ttl:
+            return entry["value"]
+        if age < ttl * STALE_TTL_MULTIPLIER:
+            _refresh_in_background(key, fetch)
+            return entry["value"]
+
+    started_at = time.time()
+    value = fetch()
+    put(key, value, started_at)
+    return value
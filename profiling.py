@@ -0,0 +1,180 @@
+# profiling.py
+
+import os
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+import config
+import json_store
+from config import DATA_DIR
+
+# 단계별 프로파일 결과는 <실행 폴더>/profile/에 저장합니다. (실행 폴더가 없는 단계는 data/profile/)
+PROFILE_DIR = "profile"
+SUMMARY_FILE = "profile_summary.json"
+# 단계별 기준값 (--update-baseline으로 갱신, 기준값이 없는 단계는 첫 결과를 기준값으로 저장)
+BASELINE_PATH = os.path.join(DATA_DIR, "profile_baseline.json")
+
+TOP_FUNCTIONS = 15
+TOP_ALLOCATORS = 10
+# 너무 짧거나 작은 단계는 측정 오차가 커서 회귀 판정에서 제외합니다.
+MIN_WALL_SECONDS = 1.0
+MIN_PEAK_MB = 10.0
+
+
+@dataclass
+class StageProfile:
+    """profile_stage()가 돌려주는 단계 정보입니다. 단계 안에서 run_folder를 정하면 그 폴더에 결과를 저장합니다."""
+    name: str
+    run_folder: str = None
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    peak_memory_mb: float = 0.0
+    top_functions: list = field(default_factory=list)
+    top_allocators: list = field(default_factory=list)
+    regressions: list = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class Profiler:
+    """
+    파이프라인 단계를 CPU 프로파일(cProfile)과 메모리 추적(tracemalloc)으로 감쌉니다.
+    enabled가 False이면 profile_stage()는 아무것도 측정하지 않습니다.
+    """
+    enabled: bool = False
+    regression_threshold: float = 0.5
+    update_baseline: bool = False
+
+    @classmethod
+    def from_config(cls, pipeline_config, enabled=False, update_baseline=False):
+        return cls(enabled=enabled, regression_threshold=pipeline_config.profile_regression_threshold,
+                   update_baseline=update_baseline)
+
+    @contextmanager
+    def profile_stage(self, name, run_folder=None):
+        stage = StageProfile(name, run_folder)
+        if not self.enabled:
+            yield stage
+            return
+
+        import cProfile
+        import tracemalloc
+
+        profiler = cProfile.Profile()
+        # PYTHONTRACEMALLOC 등으로 이미 추적 중이면 그대로 두고 최대값만 초기화합니다.
+        # (reset_peak은 Python 3.9부터 있으므로, 3.8에서는 이미 추적 중일 때 이전 최대값이 포함될 수 있습니다)
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        if hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
+        profiler.enable()
+        try:
+            yield stage
+        finally:
+            profiler.disable()
+            stage.wall_seconds = time.perf_counter() - start_wall
+            stage.cpu_seconds = time.process_time() - start_cpu
+            stage.peak_memory_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+            stage.top_allocators = _top_allocators(tracemalloc.take_snapshot())
+            if started_tracing:
+                tracemalloc.stop()
+            try:
+                self._save_stage(stage, profiler)
+            except OSError as e:
+                print(f"⚠️ [{name}] 프로파일 결과 저장 실패: {e}")
+
+    def _save_stage(self, stage, profiler):
+        import pstats
+
+        output_dir = os.path.join(stage.run_folder or DATA_DIR, PROFILE_DIR)
+        os.makedirs(output_dir, exist_ok=True)
+        prof_path = os.path.join(output_dir, f"{stage.name}.prof")
+        profiler.dump_stats(prof_path)
+
+        stage.top_functions = _top_functions(pstats.Stats(profiler))
+        stage.regressions = self._compare_with_baseline(stage)
+
+        # 사람이 읽는 보고서: 누적 시간 기준 상위 함수와 메모리를 많이 잡고 있는 코드 위치
+        with open(os.path.join(output_dir, f"{stage.name}.txt"), "w", encoding="utf-8") as f:
+            f.write(f"[{stage.name}] 실행 시간 {stage.wall_seconds:.2f}초, CPU {stage.cpu_seconds:.2f}초, "
+                    f"최대 메모리 {stage.peak_memory_mb:.1f}MB\n\n")
+            pstats.Stats(profiler, stream=f).sort_stats("cumulative").print_stats(40)
+            f.write("\n--- 메모리 할당 상위 위치 (단계 종료 시점) ---\n")
+            for allocator in stage.top_allocators:
+                f.write(f"{allocator['size_kb']:>10.1f} KB  {allocator['count']:>8}회  {allocator['location']}\n")
+
+        # 같은 실행 폴더에 여러 단계가 동시에 기록해도 서로의 항목을 잃지 않도록 잠금을 건 채로 갱신합니다.
+        with json_store.locked_json(os.path.join(output_dir, SUMMARY_FILE), {}) as summary:
+            summary[stage.name] = {
+                "profiled_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "wall_seconds": round(stage.wall_seconds, 3),
+                "cpu_seconds": round(stage.cpu_seconds, 3),
+                "peak_memory_mb": round(stage.peak_memory_mb, 2),
+                "top_functions": stage.top_functions,
+                "top_allocators": stage.top_allocators,
+                "regressions": stage.regressions,
+                "profile_file": prof_path,
+            }
+        _print_stage(stage, output_dir)
+
+    def _compare_with_baseline(self, stage):
+        """기준값과 비교해 회귀 항목 목록을 반환하고, 필요하면 기준값을 갱신합니다."""
+        current = {"wall_seconds": round(stage.wall_seconds, 3), "peak_memory_mb": round(stage.peak_memory_mb, 2),
+                   "recorded_at": time.strftime("%Y-%m-%d %H:%M:%S")}
+        # 스케줄 실행과 수동 실행이 겹쳐도 기준값 파일을 서로 덮어쓰지 않도록 잠금을 건 채로 읽고 씁니다.
+        with json_store.locked_json(BASELINE_PATH, {}) as baseline:
+            previous = baseline.get(stage.name)
+            if previous is None or self.update_baseline:
+                baseline[stage.name] = current
+
+        regressions = []
+        if previous is not None:
+            for metric, unit, floor in (("wall_seconds", "초", MIN_WALL_SECONDS),
+                                        ("peak_memory_mb", "MB", MIN_PEAK_MB)):
+                base, value = previous.get(metric, 0), current[metric]
+                if base >= floor and value > base * (1 + self.regression_threshold):
+                    regressions.append(f"{metric}: {base}{unit} → {value}{unit} (+{(value / base - 1) * 100:.0f}%)")
+        return regressions
+
+
+def profiler_from_argv(argv=None):
+    """모듈 단독 실행용: 명령줄에 --profile(과 --update-baseline)이 있으면 활성화된 Profiler를 반환합니다."""
+    argv = sys.argv[1:] if argv is None else argv
+    if "--profile" not in argv:
+        return Profiler()
+    return Profiler.from_config(config.load_config(), enabled=True, update_baseline="--update-baseline" in argv)
+
+
+def _top_functions(stats):
+    """자체 실행 시간(tottime) 기준 상위 함수 목록을 반환합니다."""
+    rows = []
+    for (file_name, line, function), (_, calls, tottime, cumtime, _) in stats.stats.items():
+        location = function if file_name == "~" else f"{os.path.basename(file_name)}:{line}({function})"
+        rows.append({"function": location, "calls": calls,
+                     "tottime": round(tottime, 4), "cumtime": round(cumtime, 4)})
+    rows.sort(key=lambda row: row["tottime"], reverse=True)
+    return rows[:TOP_FUNCTIONS]
+
+
+def _top_allocators(snapshot):
+    import tracemalloc
+
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    ))
+    return [{"location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+             "size_kb": round(stat.size / 1024, 1), "count": stat.count}
+            for stat in snapshot.statistics("lineno")[:TOP_ALLOCATORS]]
+
+
+def _print_stage(stage, output_dir):
+    print(f"\n⏱️ [{stage.name}] 실행 시간 {stage.wall_seconds:.2f}초, CPU {stage.cpu_seconds:.2f}초, "
+          f"최대 메모리 {stage.peak_memory_mb:.1f}MB (결과: {output_dir})")
+    for row in stage.top_functions[:5]:
+        print(f"  - {row['tottime']:>8.3f}초  {row['calls']:>8}회  {row['function']}")
+    for regression in stage.regressions:
+        print(f"  - ⚠️ 성능 회귀: {regression}")
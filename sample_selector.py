@@ -0,0 +1,163 @@
+# sample_selector.py
+
+import json
+
+import storage
+
+# --- 선별 점수 가중치 ---
+UNCERTAINTY_WEIGHT = 0.5
+RARITY_WEIGHT = 0.3
+DIVERSITY_WEIGHT = 0.2
+# 임계값으로부터 이 거리 안에 있는 확률을 '불확실'하다고 봅니다.
+UNCERTAINTY_WINDOW = 0.2
+DEFAULT_THRESHOLD = 0.5
+HASH_BITS = 64
+
+
+def uncertainty_score(raw_predictions, thresholds):
+    """
+    이미지의 예측 중 임계값에 가장 가까운 예측을 기준으로 0~1 사이 불확실도를 계산합니다.
+    임계값과 같은 확률이면 1, UNCERTAINTY_WINDOW 이상 떨어져 있으면 0입니다.
+    """
+    best = 0.0
+    for pred in raw_predictions:
+        probability = pred.get("probability")
+        if probability is None:
+            continue
+        threshold = thresholds.get(pred.get("tagName"), DEFAULT_THRESHOLD)
+        margin = abs(probability - threshold)
+        best = max(best, 1.0 - min(margin / UNCERTAINTY_WINDOW, 1.0))
+    return best
+
+
+def rarity_scores(coco_data):
+    """
+    이번 후보 안에서 적게 등장한 카테고리를 포함한 이미지일수록 높은 점수(0~1)를 부여합니다.
+    반환값: {image_id: rarity}
+    """
+    category_counts = {}
+    image_categories = {}
+    for ann in coco_data.get("annotations", []):
+        category_counts[ann["category_id"]] = category_counts.get(ann["category_id"], 0) + 1
+        image_categories.setdefault(ann["image_id"], set()).add(ann["category_id"])
+    if not category_counts:
+        return {}
+    min_count = min(category_counts.values())
+    return {image_id: max(min_count / category_counts[cat_id] for cat_id in cat_ids)
+            for image_id, cat_ids in image_categories.items()}
+
+
+def difference_hash(image_file, hash_size=8):
+    """열린 이미지 파일의 dHash(64비트 정수)를 계산합니다. 읽을 수 없으면 None을 반환합니다."""
+    try:
+        from PIL import Image
+        with Image.open(image_file) as img:
+            small = img.convert("L").resize((hash_size + 1, hash_size))
+            pixels = list(small.getdata())
+    except Exception:
+        return None
+    value = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            value = (value << 1) | (1 if left > right else 0)
+    return value
+
+
+def _hamming_distance(a, b):
+    return bin(a ^ b).count("1")
+
+
+def select_samples(coco_data, image_folder, budget):
+    """
+    불확실도, 클래스 희소성, 다양성(dHash 거리)을 기준으로 업로드할 이미지를 선별합니다.
+    budget이 0 이하이거나 후보 수 이상이면 해시 계산 없이 모든 후보를 선택하고 기본 점수만 기록합니다.
+    반환값: (선별된 이미지만 포함한 coco_data, 이미지별 선별 결과 리스트)
+    """
+    thresholds = {cat["name"]: cat.get("threshold", DEFAULT_THRESHOLD) for cat in coco_data.get("categories", [])}
+    annotated_ids = {ann["image_id"] for ann in coco_data.get("annotations", [])}
+    candidates = [img for img in coco_data.get("images", []) if img["id"] in annotated_ids]
+    rarity = rarity_scores(coco_data)
+    try:
+        run_data = storage.open_run(image_folder)
+    except FileNotFoundError:
+        run_data = None
+
+    def image_hash(file_name):
+        if run_data is None or not run_data.has_image(file_name):
+            return None
+        with run_data.open_image(file_name) as f:
+            return difference_hash(f)
+
+    scored = []
+    for img in candidates:
+        unc = uncertainty_score(img.get("raw_predictions", []), thresholds)
+        rar = rarity.get(img["id"], 0.0)
+        base_score = UNCERTAINTY_WEIGHT * unc + RARITY_WEIGHT * rar
+        scored.append({"image": img, "uncertainty": unc, "rarity": rar, "base_score": base_score,
+                       "score": base_score, "diversity": None})
+
+    if budget <= 0 or budget >= len(scored):
+        # 모든 후보가 선택되므로 해시 계산과 다양성 비교를 건너뛰고 기본 점수 순으로만 정렬합니다.
+        selected = sorted(scored, key=lambda e: e["base_score"], reverse=True)
+        remaining = []
+    else:
+        for entry in scored:
+            entry["hash"] = image_hash(entry["image"]["file_name"])
+            entry["diversity"] = 1.0
+            entry["score"] = entry["base_score"] + DIVERSITY_WEIGHT
+        selected, remaining = [], list(scored)
+        # 이미 선택된 이미지와 해시 거리가 먼 이미지를 우대하는 탐욕적 선택
+        # 후보마다 '선택된 이미지까지의 최소 거리'를 유지하고, 매 회 새로 선택된 해시와만 비교합니다. (O(n·k))
+        while len(selected) < budget:
+            best = max(remaining, key=lambda e: e["score"])
+            remaining.remove(best)
+            selected.append(best)
+            if best["hash"] is None:
+                continue
+            for entry in remaining:
+                if entry["hash"] is None:
+                    continue
+                distance = _hamming_distance(entry["hash"], best["hash"]) / HASH_BITS
+                if distance < entry["diversity"]:
+                    entry["diversity"] = distance
+                    entry["score"] = entry["base_score"] + DIVERSITY_WEIGHT * distance
+        remaining.sort(key=lambda e: e["score"], reverse=True)
+
+    selected_ids = {entry["image"]["id"] for entry in selected}
+    selected_coco = {
+        "images": [img for img in coco_data["images"] if img["id"] in selected_ids],
+        "annotations": [ann for ann in coco_data["annotations"] if ann["image_id"] in selected_ids],
+        "categories": coco_data["categories"],
+    }
+
+    decisions = []
+    for rank, entry in enumerate(selected + remaining, 1):
+        decisions.append({
+            "file_name": entry["image"]["file_name"],
+            "selected": entry["image"]["id"] in selected_ids,
+            "rank": rank,
+            "score": round(entry["score"], 4),
+            "uncertainty": round(entry["uncertainty"], 4),
+            "rarity": round(entry["rarity"], 4),
+            "diversity": None if entry["diversity"] is None else round(entry["diversity"], 4),
+        })
+    return selected_coco, decisions
+
+
+def report_selection(decisions, budget, report_path=None):
+    """선별 결과를 출력하고, report_path가 주어지면 JSON 파일로 저장합니다."""
+    selected = [d for d in decisions if d["selected"]]
+    budget_text = "제한 없음" if budget <= 0 else f"{budget}개"
+    print(f"\n🎯 샘플 선별: 후보 {len(decisions)}개 중 {len(selected)}개 선택 (예산: {budget_text})")
+    for d in decisions:
+        mark = "✅" if d["selected"] else "⏭️"
+        diversity = "-" if d["diversity"] is None else f"{d['diversity']:.2f}"
+        print(f"  {mark} #{d['rank']:03d} {d['file_name']} (점수 {d['score']:.2f} | 불확실도 {d['uncertainty']:.2f}"
+              f" | 희소성 {d['rarity']:.2f} | 다양성 {diversity})")
+
+    if report_path:
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump({"budget": budget, "decisions": decisions}, f, indent=2, ensure_ascii=False)
+        print(f"  - 선별 결과 저장: {report_path}")
@@ -0,0 +1,277 @@
+# storage.py
+
+import io
+import os
+import shutil
+import time
+import zipfile
+
+import json_store
+from config import DATA_DIR, RUN_FOLDER_PREFIX
+
+# 가장 최근 실행 폴더를 가리키는 포인터 파일 (data/ 전체를 훑지 않고 바로 찾기 위함)
+LATEST_POINTER_PATH = os.path.join(DATA_DIR, "latest.json")
+# 오래된 실행 폴더를 압축해 두는 폴더(<데이터 폴더>/archive/)와 그 색인 파일
+ARCHIVE_FOLDER = "archive"
+ARCHIVE_INDEX_FILE = "index.json"
+IMAGE_FOLDER = "thumbnails"
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+# 이미 압축된 이미지 형식은 다시 압축하지 않고 저장만 합니다.
+STORED_EXTENSIONS = IMAGE_EXTENSIONS + (".avif", ".webp")
+
+
+def _archive_dir(base_data_dir):
+    return os.path.join(base_data_dir, ARCHIVE_FOLDER)
+
+
+def _archive_index_path(base_data_dir):
+    return os.path.join(_archive_dir(base_data_dir), ARCHIVE_INDEX_FILE)
+
+
+def _run_name(path):
+    """실행 폴더 경로, thumbnails 폴더 경로, 또는 실행 이름에서 실행 이름을 뽑아냅니다."""
+    path = os.path.normpath(path)
+    if os.path.basename(path) == IMAGE_FOLDER:
+        path = os.path.dirname(path)
+    return os.path.basename(path)
+
+
+# --- 최신 실행 포인터 ---
+def mark_latest(run_folder):
+    """크롤링이 끝난 실행 폴더를 최신 실행으로 기록합니다."""
+    base_data_dir = os.path.dirname(os.path.normpath(run_folder))
+    json_store.write_json_atomic(os.path.join(base_data_dir, os.path.basename(LATEST_POINTER_PATH)),
+                                 {"run": _run_name(run_folder), "updated_at": time.time()})
+
+
+def list_run_folders(base_data_dir=DATA_DIR):
+    """압축되지 않은 실행 폴더 이름을 오래된 순으로 반환합니다."""
+    if not os.path.exists(base_data_dir):
+        return []
+    return sorted(d for d in os.listdir(base_data_dir)
+                  if os.path.isdir(os.path.join(base_data_dir, d)) and d.startswith(RUN_FOLDER_PREFIX))
+
+
+def find_latest_run_folder(base_data_dir=DATA_DIR):
+    """
+    가장 최근 크롤링 실행 폴더의 경로를 반환합니다. 없으면 None을 반환합니다.
+    latest.json 포인터를 먼저 확인하고, 포인터가 없거나 폴더가 사라졌을 때만 data/ 폴더를 훑습니다.
+    """
+    pointer = json_store.read_json(os.path.join(base_data_dir, os.path.basename(LATEST_POINTER_PATH)), {})
+    if pointer.get("run") and os.path.isdir(os.path.join(base_data_dir, pointer["run"])):
+        return os.path.join(base_data_dir, pointer["run"])
+    run_folders = list_run_folders(base_data_dir)
+    if not run_folders:
+        return None
+    return os.path.join(base_data_dir, run_folders[-1])
+
+
+# --- 실행 데이터 읽기 API ---
+class RunFolder:
+    """압축되지 않은 실행 폴더를 읽습니다."""
+
+    def __init__(self, run_folder):
+        self.path = run_folder
+        self.name = _run_name(run_folder)
+        self.archived = False
+
+    def list_files(self):
+        files = []
+        for root, _, names in os.walk(self.path):
+            for file_name in names:
+                files.append(os.path.relpath(os.path.join(root, file_name), self.path).replace(os.sep, "/"))
+        return files
+
+    def has_file(self, relpath):
+        return os.path.isfile(os.path.join(self.path, relpath))
+
+    def open_file(self, relpath):
+        return open(os.path.join(self.path, relpath), "rb")
+
+    def list_images(self):
+        image_folder = os.path.join(self.path, IMAGE_FOLDER)
+        return [f for f in os.listdir(image_folder) if f.lower().endswith(IMAGE_EXTENSIONS)]
+
+    def has_image(self, file_name):
+        return self.has_file(f"{IMAGE_FOLDER}/{file_name}")
+
+    def open_image(self, file_name):
+        return self.open_file(f"{IMAGE_FOLDER}/{file_name}")
+
+
+class ArchivedRun(RunFolder):
+    """
+    압축된 실행 데이터를 풀지 않고 필요한 파일만 읽습니다.
+    압축 후 다시 생성된 파일(예: 재예측한 predictions.json)은 data/<실행 이름>/에 있으며 압축본보다 우선합니다.
+    """
+
+    def __init__(self, run_name, index_entry, base_data_dir=DATA_DIR):
+        self.path = os.path.join(_archive_dir(base_data_dir), index_entry["archive"])
+        self.name = run_name
+        self.archived = True
+        self._members = set(index_entry["members"])
+        self._overlay = os.path.join(base_data_dir, run_name)
+
+    def list_files(self):
+        overlay_files = RunFolder(self._overlay).list_files() if os.path.isdir(self._overlay) else []
+        return sorted(set(self._members) | set(overlay_files))
+
+    def has_file(self, relpath):
+        return relpath in self._members or os.path.isfile(os.path.join(self._overlay, relpath))
+
+    def open_file(self, relpath):
+        if os.path.isfile(os.path.join(self._overlay, relpath)):
+            return open(os.path.join(self._overlay, relpath), "rb")
+        # PIL 등은 seek가 필요하므로 해당 항목만 읽어 메모리 버퍼로 돌려줍니다.
+        # 읽을 때마다 압축 파일을 열고 닫아, 호출하는 쪽이 정리하지 않아도 파일 핸들이 남지 않게 합니다.
+        with zipfile.ZipFile(self.path, "r") as archive:
+            return io.BytesIO(archive.read(relpath))
+
+    def list_images(self):
+        prefix = f"{IMAGE_FOLDER}/"
+        return sorted(m[len(prefix):] for m in self._members
+                      if m.startswith(prefix) and m.lower().endswith(IMAGE_EXTENSIONS))
+
+
+def load_archive_index(base_data_dir=DATA_DIR):
+    return json_store.read_json(_archive_index_path(base_data_dir), {})
+
+
+def open_run(path_or_name, base_data_dir=None):
+    """
+    실행 폴더 경로, thumbnails 폴더 경로, 실행 이름 중 무엇을 받아도 해당 실행의 읽기 객체를 반환합니다.
+    폴더에 이미지가 있으면 폴더를, 없으면 압축본을 사용합니다.
+    base_data_dir를 지정하지 않으면 경로의 상위 폴더(실행 이름만 주어지면 data/)를 데이터 폴더로 봅니다.
+    """
+    run_name = _run_name(path_or_name)
+    run_folder = os.path.normpath(path_or_name)
+    if os.path.basename(run_folder) == IMAGE_FOLDER:
+        run_folder = os.path.dirname(run_folder)
+    if base_data_dir is None:
+        base_data_dir = os.path.dirname(run_folder) or DATA_DIR
+    if not os.path.isdir(run_folder):
+        run_folder = os.path.join(base_data_dir, run_name)
+    if os.path.isdir(os.path.join(run_folder, IMAGE_FOLDER)):
+        return RunFolder(run_folder)
+
+    index_entry = load_archive_index(base_data_dir).get(run_name)
+    if index_entry:
+        return ArchivedRun(run_name, index_entry, base_data_dir)
+    raise FileNotFoundError(f"실행 데이터를 찾을 수 없습니다: {path_or_name}")
+
+
+# --- 압축 ---
+def compact_run(run_name, base_data_dir=DATA_DIR):
+    """
+    실행 폴더를 <데이터 폴더>/archive/<실행 이름>.zip으로 묶고 원본 폴더를 삭제합니다.
+    이미 압축본이 있으면(예: 압축 후 다시 예측한 경우) 기존 항목에 폴더의 새 파일을 덮어써 합칩니다.
+    """
+    run_folder = os.path.join(base_data_dir, run_name)
+    index = load_archive_index(base_data_dir)
+    archive_name = f"{run_name}.zip"
+    archive_path = os.path.join(_archive_dir(base_data_dir), archive_name)
+    tmp_path = f"{archive_path}.{os.getpid()}.tmp"
+    os.makedirs(_archive_dir(base_data_dir), exist_ok=True)
+
+    folder_files = RunFolder(run_folder).list_files()
+    with zipfile.ZipFile(tmp_path, "w") as archive:
+        for relpath in folder_files:
+            compress_type = zipfile.ZIP_STORED if relpath.lower().endswith(STORED_EXTENSIONS) else zipfile.ZIP_DEFLATED
+            archive.write(os.path.join(run_folder, relpath), relpath, compress_type=compress_type)
+        if run_name in index and os.path.isfile(archive_path):
+            with zipfile.ZipFile(archive_path, "r") as previous:
+                for info in previous.infolist():
+                    if info.filename not in folder_files:
+                        archive.writestr(info, previous.read(info.filename))
+        # 색인에는 항목 이름만 남깁니다. (실제 읽기는 zip의 중앙 디렉터리를 사용합니다)
+        members = sorted(info.filename for info in archive.infolist())
+    os.replace(tmp_path, archive_path)
+
+    index[run_name] = {"archive": archive_name, "archived_at": time.time(),
+                       "bytes": os.path.getsize(archive_path), "members": members}
+    json_store.write_json_atomic(_archive_index_path(base_data_dir), index)
+    shutil.rmtree(run_folder)
+    return archive_path
+
+
+def compact_old_runs(keep_recent, base_data_dir=DATA_DIR):
+    """최신 keep_recent개(와 latest 포인터가 가리키는 실행)를 제외한 실행 폴더를 압축합니다."""
+    keep_recent = max(keep_recent, 1)
+    run_folders = list_run_folders(base_data_dir)
+    latest = find_latest_run_folder(base_data_dir)
+    latest_name = _run_name(latest) if latest else None
+    compacted = []
+    for run_name in run_folders[:-keep_recent]:
+        if run_name == latest_name:
+            continue
+        try:
+            compact_run(run_name, base_data_dir)
+            compacted.append(run_name)
+            print(f"  - 🗜️ 압축 완료: {run_name}")
+        except OSError as e:
+            print(f"  - ❌ 압축 실패: {run_name} ({e})")
+    return compacted
+
+
+# --- 보존 정책 ---
+def _folder_size(path):
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+
+def _run_created_at(run_name):
+    """실행 이름(youtube_trending_YYYY-mm-dd_HH-MM-SS)에서 생성 시각(epoch)을 계산합니다."""
+    try:
+        return time.mktime(time.strptime(run_name[len(RUN_FOLDER_PREFIX):], "%Y-%m-%d_%H-%M-%S"))
+    except ValueError:
+        return None
+
+
+def enforce_retention(max_age_days=0, max_total_mb=0, base_data_dir=DATA_DIR):
+    """
+    기간(max_age_days)과 전체 용량(max_total_mb) 기준으로 오래된 압축본부터 삭제합니다.
+    압축되지 않은 최근 실행 폴더는 삭제하지 않습니다. 0이면 해당 기준을 적용하지 않습니다.
+    """
+    index = load_archive_index(base_data_dir)
+    removed = []
+
+    def remove(run_name):
+        entry = index.pop(run_name)
+        try:
+            os.remove(os.path.join(_archive_dir(base_data_dir), entry["archive"]))
+        except FileNotFoundError:
+            pass
+        removed.append(run_name)
+        print(f"  - 🗑️ 보존 기간/용량 초과로 삭제: {run_name}")
+
+    if max_age_days > 0:
+        cutoff = time.time() - max_age_days * 86400
+        for run_name in sorted(index):
+            created_at = _run_created_at(run_name) or index[run_name].get("archived_at", 0)
+            if created_at < cutoff:
+                remove(run_name)
+
+    if max_total_mb > 0:
+        limit = max_total_mb * 1024 * 1024
+        total = sum(entry["bytes"] for entry in index.values())
+        total += sum(_folder_size(os.path.join(base_data_dir, d)) for d in list_run_folders(base_data_dir))
+        for run_name in sorted(index):
+            if total <= limit:
+                break
+            total -= index[run_name]["bytes"]
+            remove(run_name)
+        if total > limit:
+            print(f"  - ⚠️ 압축되지 않은 최근 실행만으로 용량 한도({max_total_mb}MB)를 초과합니다.")
+
+    if removed:
+        json_store.write_json_atomic(_archive_index_path(base_data_dir), index)
+    return removed
+
+
+def run_maintenance(pipeline_config, base_data_dir=DATA_DIR):
+    """오래된 실행 폴더를 압축하고 보존 정책을 적용합니다."""
+    print("\n📦 실행 데이터 정리를 시작합니다...")
+    compacted = compact_old_runs(pipeline_config.storage_keep_recent_runs, base_data_dir)
+    removed = enforce_retention(pipeline_config.storage_max_age_days, pipeline_config.storage_max_disk_mb,
+                                base_data_dir)
+    print(f"  - ✅ 정리 완료 (압축 {len(compacted)}개, 삭제 {len(removed)}개)")
+    return compacted, removed
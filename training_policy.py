@@ -0,0 +1,105 @@
+# training_policy.py
+
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+
+@dataclass(frozen=True)
+class TrainingPolicy:
+    """학습 실행 여부, 학습 방식, Iteration 보존 개수를 결정하는 정책값입니다."""
+    # 마지막 학습 이후 이 개수 이상의 이미지 또는 영역(region)이 쌓이면 학습합니다.
+    min_new_images: int = 20
+    min_new_regions: int = 50
+    # 새 데이터가 조금이라도 있고 마지막 학습 후 이 일수가 지나면 학습합니다.
+    max_days_since_train: int = 7
+    # 새 이미지가 기존 학습 데이터 대비 이 비율 이상 늘었을 때만 고급(Advanced) 학습을 사용합니다.
+    advanced_growth_ratio: float = 0.3
+    advanced_budget_hours: int = 1
+    # 최신 Iteration을 이 개수만큼 남기고 나머지는 게시 취소 후 삭제합니다. (0이면 삭제하지 않음)
+    iteration_retention: int = 5
+
+    @classmethod
+    def from_config(cls, pipeline_config):
+        return cls(
+            min_new_images=pipeline_config.train_min_new_images,
+            min_new_regions=pipeline_config.train_min_new_regions,
+            max_days_since_train=pipeline_config.train_max_days_since_train,
+            advanced_growth_ratio=pipeline_config.train_advanced_growth_ratio,
+            advanced_budget_hours=pipeline_config.train_advanced_budget_hours,
+            iteration_retention=pipeline_config.iteration_retention,
+        )
+
+
+@dataclass(frozen=True)
+class TrainingDecision:
+    should_train: bool
+    advanced: bool
+    budget_hours: int
+    reason: str
+
+
+def parse_azure_datetime(value):
+    """Azure가 반환하는 ISO 8601 시각 문자열을 timezone-aware datetime으로 변환합니다."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        # 소수점 이하 자릿수가 7자리인 경우 등은 초 단위까지만 사용
+        try:
+            parsed = datetime.fromisoformat(value[:19])
+        except ValueError:
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def last_trained_at(iterations):
+    """학습이 완료된 Iteration 중 가장 최근 학습 시각을 반환합니다. 없으면 None을 반환합니다."""
+    trained = [parse_azure_datetime(it.get("trainedAt")) for it in iterations if it.get("status") == "Completed"]
+    trained = [t for t in trained if t is not None]
+    return max(trained) if trained else None
+
+
+def decide_training(policy, new_images, new_regions, total_images, trained_at, now=None):
+    """
+    마지막 학습 이후 쌓인 이미지/영역 수와 경과 일수로 학습 여부와 방식을 결정합니다.
+    데이터 증가가 작으면 비용이 적은 일반(Regular) 학습을 기본으로 사용합니다.
+    """
+    now = now or datetime.now(timezone.utc)
+    if new_images <= 0:
+        return TrainingDecision(False, False, 0, "마지막 학습 이후 새로운 데이터가 없습니다.")
+
+    days_since = None if trained_at is None else (now - trained_at).total_seconds() / 86400
+    if trained_at is None:
+        reason = "아직 학습된 Iteration이 없습니다."
+    elif new_images >= policy.min_new_images:
+        reason = f"새 이미지 {new_images}개 (기준 {policy.min_new_images}개 이상)"
+    elif new_regions >= policy.min_new_regions:
+        reason = f"새 영역 {new_regions}개 (기준 {policy.min_new_regions}개 이상)"
+    elif days_since >= policy.max_days_since_train:
+        reason = f"마지막 학습 후 {days_since:.1f}일 경과 (기준 {policy.max_days_since_train}일)"
+    else:
+        return TrainingDecision(
+            False, False, 0,
+            f"새 이미지 {new_images}개/영역 {new_regions}개, 마지막 학습 후 {days_since:.1f}일로 학습 기준 미달")
+
+    previous_images = max(total_images - new_images, 1)
+    growth = new_images / previous_images
+    if policy.advanced_budget_hours > 0 and growth >= policy.advanced_growth_ratio:
+        return TrainingDecision(True, True, policy.advanced_budget_hours,
+                                f"{reason} / 데이터 증가율 {growth:.0%} → 고급 학습 ({policy.advanced_budget_hours}시간)")
+    return TrainingDecision(True, False, 0, f"{reason} / 데이터 증가율 {growth:.0%} → 일반 학습")
+
+
+def iterations_to_retire(iterations, retention, keep_ids=()):
+    """
+    생성 시각 기준 최신 retention개를 제외한 Iteration 목록을 반환합니다.
+    학습 중인 Iteration과 keep_ids에 포함된 Iteration은 제외합니다.
+    """
+    if retention <= 0:
+        return []
+    ordered = sorted(iterations, key=lambda it: it.get("created") or "", reverse=True)
+    return [it for it in ordered[retention:]
+            if it.get("id") not in keep_ids and it.get("status") != "Training"]
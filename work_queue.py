@@ -0,0 +1,162 @@
+# work_queue.py
+
+import json
+import os
+import sqlite3
+import time
+
+from config import WORK_QUEUE_PATH
+
+# 코디네이터와 워커가 공유하는 작업 큐 파일
+# 다른 호스트의 워커는 같은 경로를 파일 잠금을 지원하는 공유 저장소(SMB, 잠금이 켜진 NFS 등)로 마운트해야 합니다.
+DEFAULT_QUEUE_PATH = WORK_QUEUE_PATH
+DEFAULT_LEASE_SECONDS = 120
+DEFAULT_MAX_ATTEMPTS = 5
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    task_key TEXT NOT NULL UNIQUE,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_lease ON tasks (status, kind, lease_expires);
+CREATE INDEX IF NOT EXISTS idx_tasks_job ON tasks (job, kind, status);
+"""
+
+
+class WorkQueue:
+    """
+    SQLite 기반의 내구성 있는 작업 큐입니다.
+    워커는 작업을 일정 시간 임대(lease)하고 주기적으로 연장(heartbeat)하며, 임대가 만료된 작업은
+    다른 워커가 다시 가져갈 수 있습니다. 따라서 각 작업은 최소 한 번(at-least-once) 실행됩니다.
+    """
+
+    def __init__(self, path=DEFAULT_QUEUE_PATH, lease_seconds=DEFAULT_LEASE_SECONDS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        # WAL 모드는 공유 메모리(-shm)를 써서 네트워크 파일 시스템에서는 안전하지 않으므로,
+        # 다른 호스트의 워커와 큐 파일을 공유할 수 있도록 롤백 저널 모드를 사용합니다.
+        conn.execute("PRAGMA journal_mode=DELETE")
+        return conn
+
+    def enqueue(self, job, kind, task_key, payload, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        """
+        작업을 추가하고, 새로 추가되었거나 다시 대기 상태가 되었으면 True를 반환합니다.
+        같은 task_key가 대기/진행/완료 상태로 이미 있으면 그대로 두므로 코디네이터를 다시 실행해도 안전하며,
+        실패로 끝난 작업은 재시도 횟수를 초기화하여 다시 대기 상태로 돌립니다.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO tasks (job, kind, task_key, payload, max_attempts, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (task_key) DO UPDATE SET status = 'pending', attempts = 0, error = NULL,"
+                " payload = excluded.payload, max_attempts = excluded.max_attempts, lease_owner = NULL,"
+                " lease_expires = NULL, updated_at = excluded.updated_at WHERE tasks.status = 'failed'",
+                (job, kind, task_key, json.dumps(payload, ensure_ascii=False), max_attempts, now, now))
+            return cursor.rowcount == 1
+
+    def lease(self, worker_id, kinds=None, lease_seconds=None):
+        """
+        대기 중이거나 임대가 만료된 작업 하나를 임대하여 반환합니다. 없으면 None을 반환합니다.
+        재시도 횟수를 모두 쓴 채 임대가 만료된 작업은 실패로 처리합니다.
+        """
+        now = time.time()
+        lease_seconds = lease_seconds or self.lease_seconds
+        kind_filter, params = "", [now]
+        if kinds:
+            kind_filter = f" AND kind IN ({','.join('?' * len(kinds))})"
+            params.extend(kinds)
+
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "UPDATE tasks SET status = 'failed', error = COALESCE(error, '임대 만료 후 재시도 횟수 초과'),"
+                " updated_at = ? WHERE status = 'leased' AND lease_expires < ? AND attempts >= max_attempts",
+                (now, now))
+            row = conn.execute(
+                "SELECT * FROM tasks WHERE (status = 'pending' OR (status = 'leased' AND lease_expires < ?))"
+                f"{kind_filter} ORDER BY id LIMIT 1", params).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE tasks SET status = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1,"
+                " updated_at = ? WHERE id = ?",
+                (worker_id, now + lease_seconds, now, row["id"]))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+        task = dict(row)
+        task["payload"] = json.loads(task["payload"])
+        task["attempts"] += 1
+        return task
+
+    def heartbeat(self, task_id, worker_id, lease_seconds=None):
+        """임대를 연장합니다. 임대를 이미 잃었으면(만료 후 다른 워커가 가져감) False를 반환합니다."""
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET lease_expires = ?, updated_at = ?"
+                " WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+                (now + (lease_seconds or self.lease_seconds), now, task_id, worker_id))
+            return cursor.rowcount == 1
+
+    def complete(self, task_id, worker_id, result):
+        """작업 결과를 기록합니다. 먼저 끝낸 워커의 결과만 남깁니다."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE tasks SET status = 'done', result = ?, lease_owner = ?, lease_expires = NULL, updated_at = ?"
+                " WHERE id = ? AND status != 'done'",
+                (json.dumps(result, ensure_ascii=False), worker_id, time.time(), task_id))
+
+    def fail(self, task_id, worker_id, error):
+        """작업 실패를 기록합니다. 재시도 횟수가 남아 있으면 다시 대기 상태로 돌립니다."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE tasks SET status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'pending' END,"
+                " error = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ?"
+                " WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+                (str(error), time.time(), task_id, worker_id))
+
+    def counts(self, job, kind=None):
+        """작업 상태별 개수를 반환합니다. 예: {'pending': 3, 'leased': 1, 'done': 10}"""
+        query, params = "SELECT status, COUNT(*) FROM tasks WHERE job = ?", [job]
+        if kind:
+            query += " AND kind = ?"
+            params.append(kind)
+        with self._connect() as conn:
+            return {status: count for status, count in conn.execute(query + " GROUP BY status", params)}
+
+    def results(self, job, kind):
+        """완료/실패한 작업의 (payload, result, error, status) 목록을 반환합니다."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT payload, result, error, status FROM tasks WHERE job = ? AND kind = ?"
+                " AND status IN ('done', 'failed') ORDER BY id", (job, kind)).fetchall()
+        return [(json.loads(row["payload"]), json.loads(row["result"]) if row["result"] else None,
+                 row["error"], row["status"]) for row in rows]